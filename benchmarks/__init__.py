@@ -0,0 +1 @@
+"""Benchmarks for the note XML -> Markdown conversion. Run modules with `python -m benchmarks.<name>`."""
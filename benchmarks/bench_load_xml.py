@@ -0,0 +1,89 @@
+"""
+load_xml の旧実装 (全体を shift-jis / utf-8 で試しにデコードしてから ET.fromstring) と
+新実装 (先頭バイトで文字コードを判定し、パーサーへ直接渡す) を比較するベンチマーク。
+
+    python -m benchmarks.bench_load_xml --items 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from typing import Any, Callable
+
+from xml_to_markdown_converter import iter_items, load_xml
+
+ITEM_TEMPLATE = (
+    "<item><title>投稿 {i}</title><link>https://note.com/example/n/n{i:08x}</link>"
+    "<pubDate>Wed, 11 Feb 2026 14:50:38 +0900</pubDate>"
+    "<content:encoded><![CDATA[<h2>見出し {i}</h2><p>本文の段落です。Plain text {i}.<br>次の行</p>"
+    "<ul><li>項目</li><li>二つ目</li></ul><p><b>太字</b>と<strong>強調</strong></p>]]></content:encoded></item>\n"
+)
+
+
+def write_export(path: str, items: int, encoding: str) -> None:
+    """Write a synthetic Note RSS export with the given number of items."""
+    declared = "Shift_JIS" if encoding == "shift-jis" else "UTF-8"
+    with open(path, "w", encoding=encoding) as f:
+        f.write(f'<?xml version="1.0" encoding="{declared}"?>\n')
+        f.write('<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>\n')
+        for i in range(items):
+            f.write(ITEM_TEMPLATE.format(i=i))
+        f.write("</channel></rss>\n")
+
+
+def legacy_load_xml(filepath: str) -> Any:
+    """The previous load_xml: full read, trial decodes, then ET.fromstring on the decoded str."""
+    with open(filepath, "rb") as f:
+        raw_bytes = f.read()
+    try:
+        decoded_content = raw_bytes.decode("shift-jis")
+    except UnicodeDecodeError:
+        decoded_content = raw_bytes.decode("utf-8")
+    return ET.fromstring(decoded_content)
+
+
+def stream_items(filepath: str) -> int:
+    return sum(1 for _ in iter_items(filepath))
+
+
+def measure(func: Callable[[str], Any], path: str, repeat: int) -> tuple[float, float]:
+    """Return (best wall seconds, traced peak MiB) for func(path)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / (1 << 20)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the old and new load_xml paths")
+    parser.add_argument("--items", type=int, default=100000, help="Number of <item> elements per export")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    candidates = {
+        "legacy load_xml": legacy_load_xml,
+        "load_xml": load_xml,
+        "iter_items": stream_items,
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for encoding in ("utf-8", "shift-jis"):
+            path = os.path.join(tmpdir, f"export-{encoding}.xml")
+            write_export(path, args.items, encoding)
+            size_mib = os.path.getsize(path) / (1 << 20)
+            print(f"{encoding}: {size_mib:.1f} MiB, {args.items} items")
+            for name, func in candidates.items():
+                seconds, peak_mib = measure(func, path, args.repeat)
+                print(f"  {name:<16} {seconds:7.3f} s  {size_mib / seconds:7.1f} MiB/s  peak {peak_mib:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
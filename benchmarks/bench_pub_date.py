@@ -0,0 +1,98 @@
+"""
+parse_pub_date の旧実装 (毎回 datetime.strptime) と新実装 (固定位置の切り出し + 月の表 + fromisoformat)
+を比較するベンチマーク。計測の前に、両者の結果が全ての入力で一致することを確認します。
+
+    python -m benchmarks.bench_pub_date --dates 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from xml_to_markdown_converter import PUB_DATE_FORMAT, parse_pub_date
+
+# 形式が崩れたもの・範囲外の値など、strptime の結果に合わせる必要がある入力
+EDGE_CASES = [
+    "Wed, 11 Feb 2026 14:50:38 +0900",
+    "wed, 11 FEB 2026 14:50:38 +0900",
+    "Wed, 11 Feb 2026 14:50:38 +0000",
+    "Wed, 11 Feb 2026 14:50:38 -0930",
+    "Wed, 11 Feb 2026 14:50:38 +09:00",
+    "Wed, 11 Feb 2026 14:50:38 Z",
+    "Wed, 1 Feb 2026 14:50:38 +0900",
+    "Wednesday, 11 Feb 2026 14:50:38 +0900",
+    "Wed, 30 Feb 2026 14:50:38 +0900",
+    "Wed, 11 Feb 2026 24:50:38 +0900",
+    "Wed, 11 Feb 2026 14:50:60 +0900",
+    "Wed, 11 Feb 2026 14:50:38 +2500",
+    "Wed, 11 Feb 2026 14:50:38 +0960",
+    "Wed, 11 Fex 2026 14:50:38 +0900",
+    "Wxd, 11 Feb 2026 14:50:38 +0900",
+    "Wed, 11 Feb 2026 14:50:38 +0900 ",
+    " Wed, 11 Feb 2026 14:50:38 +0900",
+    "Wed, 1١ Feb 2026 14:50:38 +0900",
+    "Wed, +1 Feb 2026 14:50:38 +0900",
+    "Wed, 11 Feb 2026 14:50:38 +09_0",
+    "2026-02-11T14:50:38+09:00",
+    "",
+]
+
+
+def strptime_pub_date(time_str: str) -> Optional[datetime]:
+    """The previous parse_pub_date."""
+    try:
+        return datetime.strptime(time_str, PUB_DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def make_dates(count: int, seed: int = 0) -> list[str]:
+    """RFC 822 dates as they appear in exports, over many years and a few offsets."""
+    rng = random.Random(seed)
+    offsets = [timezone(timedelta(hours=9)), timezone.utc, timezone(timedelta(hours=-5)), timezone(timedelta(hours=5, minutes=30))]
+    start = datetime(2010, 1, 1, tzinfo=timezone.utc)
+    dates = []
+    for _ in range(count):
+        dt = (start + timedelta(seconds=rng.randrange(20 * 365 * 86400))).astimezone(rng.choice(offsets))
+        dates.append(dt.strftime(PUB_DATE_FORMAT))
+    return dates
+
+
+def same(a: Optional[datetime], b: Optional[datetime]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return a == b and a.isoformat() == b.isoformat() and a.tzinfo == b.tzinfo
+
+
+def measure(func: Callable[[str], Optional[datetime]], dates: list[str], repeat: int) -> float:
+    """Return the best wall seconds for parsing every date once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for time_str in dates:
+            func(time_str)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare strptime with the fixed-format pubDate parser")
+    parser.add_argument("--dates", type=int, default=200000, help="Number of pubDate strings")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    dates = make_dates(args.dates)
+    mismatches = [s for s in EDGE_CASES + dates if not same(parse_pub_date(s), strptime_pub_date(s))]
+    if mismatches:
+        raise SystemExit(f"parse_pub_date differs from strptime for: {mismatches[:10]}")
+
+    old = measure(strptime_pub_date, dates, args.repeat)
+    new = measure(parse_pub_date, dates, args.repeat)
+    print(f"{args.dates} dates, identical results (+{len(EDGE_CASES)} edge cases)")
+    print(f"  strptime        {old:7.3f} s  {old / args.dates * 1e6:6.2f} us/date")
+    print(f"  parse_pub_date  {new:7.3f} s  {new / args.dates * 1e6:6.2f} us/date  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+split_and_save_markdown の旧実装 (サイズ計測と書き込みで2回エンコードし、ファイル1つ分の str を溜めてから
+テキストモードで1件ずつ書き込む) と新実装 (1回だけエンコードしてバッファ付きでバイナリ書き込み) を比較するベンチマーク。
+
+    python -m benchmarks.bench_writer --size 1024
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, Optional
+
+from split_markdown_file import split_and_save_markdown
+
+ENTRY_TEMPLATE = (
+    "## 2026/02/11 14:50:38\n\n**Title**: 投稿 {i}\n\n"
+    "本文の段落です。Plain text paragraph with some words.\n次の行\n\n"
+    "**見出し**\n- 項目\n- 二つ目\n\n**太字**と**強調**\n\n---\n\n"
+)
+
+
+def iter_entries(total_bytes: int, distinct: int = 1000, fresh: bool = False) -> Iterator[tuple[datetime, str]]:
+    """
+    Yield (datetime, Markdown) pairs, cycling over prebuilt texts, until about total_bytes of UTF-8.
+    fresh=True yields a new str object per entry, as the converter does (needed for honest peak memory).
+    """
+    start = datetime(2026, 2, 11, 14, 50, 38, tzinfo=timezone.utc)
+    entries = [(start - timedelta(minutes=i), ENTRY_TEMPLATE.format(i=i)) for i in range(distinct)]
+    sizes = [len(text.encode("utf-8")) for _, text in entries]
+    produced = 0
+    i = 0
+    while produced < total_bytes:
+        produced += sizes[i]
+        if fresh:
+            dt, text = entries[i]
+            yield dt, text.encode("utf-8").decode("utf-8")
+        else:
+            yield entries[i]
+        i = (i + 1) % distinct
+
+
+def legacy_split_and_save(
+    markdown_texts: Iterator[tuple[datetime, str]],
+    output_basename: str,
+    output_ext: str,
+    file_size_limit: int,
+    last_entry_time_file: Optional[str] = None,
+) -> int:
+    """The previous writer: per-shard list of str, size measured by encoding, text-mode writes."""
+    file_index = 1
+    output_filename = f"{output_basename}-{file_index:02d}{output_ext}"
+    header = "# Notebook Notes Archive\n\n"
+    header += f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    current_file_size = len(header.encode("utf-8"))
+    texts_buffer: list[str] = []
+    files = 0
+    last_item_time: Optional[datetime] = None
+
+    def write(filename: str, texts: list[str]) -> None:
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(header)
+            for text in texts:
+                f.write(text)
+
+    for item in markdown_texts:
+        if isinstance(item, tuple):
+            last_item_time, text = item
+        else:
+            text = item
+        text_size = len(text.encode("utf-8"))
+        if current_file_size + text_size > file_size_limit and texts_buffer:
+            write(output_filename, texts_buffer)
+            files += 1
+            file_index += 1
+            output_filename = f"{output_basename}-{file_index:02d}{output_ext}"
+            texts_buffer = []
+            current_file_size = len(header.encode("utf-8"))
+        texts_buffer.append(text)
+        current_file_size += text_size
+    if texts_buffer:
+        write(output_filename, texts_buffer)
+        files += 1
+    return files
+
+
+def measure(
+    writer: Callable[..., int],
+    total_bytes: int,
+    limit: int,
+    traced: bool,
+    directory: Optional[str] = None,
+) -> tuple[float, float]:
+    """Return (wall seconds, traced peak MiB or 0) for writing total_bytes into a fresh directory."""
+    tmpdir = tempfile.mkdtemp(dir=directory)
+    try:
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            # 再開用のチェックポイントも一時ディレクトリに書く (カレントディレクトリの本物を上書きしないように)
+            writer(
+                iter_entries(total_bytes, fresh=traced), os.path.join(tmpdir, "Notebook_Notes"), ".md", limit,
+                last_entry_time_file=os.path.join(tmpdir, "last_entry_time.txt"),
+            )
+        seconds = time.perf_counter() - start
+        peak = 0
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return seconds, peak / (1 << 20)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the old and new Markdown shard writers")
+    parser.add_argument("--size", type=int, default=1024, help="Total Markdown output in MiB")
+    parser.add_argument("--limit", type=int, default=1500000, help="Shard size limit in bytes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument("--dir", help="Where to write the shards (e.g. /dev/shm to leave out disk speed)")
+    args = parser.parse_args()
+
+    total_bytes = args.size << 20
+    candidates = {
+        "legacy writer": legacy_split_and_save,
+        "split_and_save_markdown": split_and_save_markdown,
+    }
+    print(f"{args.size} MiB of Markdown, {args.limit} byte shards")
+    for name, writer in candidates.items():
+        seconds = min(measure(writer, total_bytes, args.limit, False, args.dir)[0] for _ in range(args.repeat))
+        _, peak_mib = measure(writer, total_bytes, args.limit, True, args.dir)
+        print(f"  {name:<24} {seconds:7.2f} s  {args.size / seconds:7.1f} MiB/s  peak {peak_mib:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
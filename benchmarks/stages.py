@@ -0,0 +1,179 @@
+"""
+変換の各段階 (load_xml, decode_unicode_escapes, html_to_markdown, extract_text_content,
+split_and_save_markdown) を合成エクスポートで個別に計測し、結果を JSON に保存します。
+compare で2つの結果を比べ、しきい値を超えて遅くなった段階があれば終了コード 1 で終わります。
+
+    python -m benchmarks.stages run --items 2000 --output new.json
+    python -m benchmarks.stages compare baseline.json new.json --threshold 0.10
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from benchmarks.synthetic import add_export_arguments, write_export
+from split_markdown_file import split_and_save_markdown
+from xml_to_markdown_converter import (
+    decode_unicode_escapes,
+    extract_entry_fields,
+    extract_text_content,
+    html_to_markdown,
+    load_xml,
+)
+
+RESULTS_VERSION = 1
+STAGES = ("load_xml", "decode_unicode_escapes", "html_to_markdown", "extract_text_content", "split_and_save_markdown")
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> list[float]:
+    """Run func repeat times and return every wall time in seconds."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_stages(path: str, repeat: int, limit: int, stages: tuple[str, ...] = STAGES) -> dict[str, dict[str, Any]]:
+    """
+    Time each stage on the export at path in isolation.
+    The inputs of a stage are prepared by the earlier stages outside of the timed region.
+    """
+    root = load_xml(path)
+    if root is None:
+        raise SystemExit(f"could not parse {path}")
+    items = root.find("channel").findall("item")
+    htmls = [extract_entry_fields(item)[2] for item in items]
+    markdown = [extract_text_content(item, _EPOCH) for item in items]
+    html_bytes = sum(len(html.encode("utf-8")) for html in htmls)
+    markdown_bytes = sum(len(text.encode("utf-8")) for _, text in markdown)
+
+    def split() -> None:
+        with tempfile.TemporaryDirectory() as tmpdir, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            split_and_save_markdown(
+                iter(markdown), os.path.join(tmpdir, "Notebook_Notes"), ".md", limit,
+                last_entry_time_file=os.path.join(tmpdir, "last_entry_time.txt"),
+            )
+
+    # 段階名 -> (計測する処理, 処理する件数, 入力のバイト数)
+    work: dict[str, tuple[Callable[[], Any], int, int]] = {
+        "load_xml": (lambda: load_xml(path), len(items), os.path.getsize(path)),
+        "decode_unicode_escapes": (lambda: [decode_unicode_escapes(h) for h in htmls], len(htmls), html_bytes),
+        "html_to_markdown": (lambda: [html_to_markdown(h) for h in htmls], len(htmls), html_bytes),
+        "extract_text_content": (lambda: [extract_text_content(i, _EPOCH) for i in items], len(items), html_bytes),
+        "split_and_save_markdown": (split, len(markdown), markdown_bytes),
+    }
+
+    results = {}
+    for name in stages:
+        func, units, size = work[name]
+        runs = best_of(func, repeat)
+        best = min(runs)
+        results[name] = {
+            "seconds": best,
+            "runs": runs,
+            "units": units,
+            "bytes": size,
+            "us_per_unit": best / units * 1e6 if units else 0.0,
+            "mib_per_s": size / (1 << 20) / best if best else 0.0,
+        }
+    return results
+
+
+def run(args: argparse.Namespace) -> None:
+    params = {
+        "items": args.items, "html_size": args.html_size, "encoding": args.encoding,
+        "tags": args.tags, "seed": args.seed, "limit": args.limit, "repeat": args.repeat,
+    }
+    stages = tuple(args.stage) if args.stage else STAGES
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "export.xml")
+        write_export(path, args.items, args.html_size, args.encoding, args.tags, args.seed)
+        stage_results = run_stages(path, args.repeat, args.limit, stages)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "stages": stage_results,
+    }
+    for name, stage in stage_results.items():
+        print(f"  {name:<24} {stage['seconds']:8.4f} s  {stage['us_per_unit']:9.2f} us/item  {stage['mib_per_s']:7.1f} MiB/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"saved to {args.output}")
+
+
+def load_results(path: str) -> dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise SystemExit(f"{path}: unsupported results version {results.get('version')!r}")
+    return results
+
+
+def compare_results(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Print the per-stage ratio current/baseline and return the stages slower by more than threshold."""
+    if baseline["params"] != current["params"]:
+        print(f"warning: different parameters\n  baseline {baseline['params']}\n  current  {current['params']}")
+    regressions = []
+    for name in STAGES:
+        if name not in baseline["stages"] or name not in current["stages"]:
+            continue
+        before = baseline["stages"][name]["seconds"]
+        after = current["stages"][name]["seconds"]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        print(f"  {name:<24} {before:8.4f} s -> {after:8.4f} s  {ratio:6.2f}x  {status}")
+    return regressions
+
+
+def compare(args: argparse.Namespace) -> None:
+    regressions = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks of the conversion on a synthetic export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Time every stage and optionally save the results as JSON")
+    add_export_arguments(run_parser)
+    run_parser.add_argument("--limit", type=int, default=1500000, help="Shard size limit for split_and_save_markdown")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is compared)")
+    run_parser.add_argument("--stage", action="append", choices=STAGES, help="Only time this stage (repeatable)")
+    run_parser.add_argument("--output", help="Where to save the results JSON")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two results files and flag regressions")
+    compare_parser.add_argument("baseline", help="Results JSON of the reference version")
+    compare_parser.add_argument("current", help="Results JSON of the version under test")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown as a fraction (0.10 = 10%%)")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
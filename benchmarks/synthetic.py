@@ -0,0 +1,146 @@
+"""
+ベンチマーク用に、Note の RSS エクスポートと同じ構造の XML を決定的に生成します。
+同じ引数 (seed を含む) からは常にバイト単位で同じファイルができるため、版の間で結果を比べられます。
+
+    python -m benchmarks.synthetic export.xml --items 10000 --html-size 4096 --tags rich
+"""
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+ENCODINGS = {
+    # 引数の名前 -> (Python のコーデック, XML 宣言に書く名前)
+    "utf-8": ("utf-8", "UTF-8"),
+    "utf-8-sig": ("utf-8-sig", "UTF-8"),
+    "shift-jis": ("shift-jis", "Shift_JIS"),
+    "utf-16": ("utf-16", "UTF-16"),
+}
+
+# strftime の %a / %b はロケールに依存するため、英語の名前を自前で持つ
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Shift_JIS でも表せる文字だけを使う
+_WORDS = ("本文", "段落", "今日", "記録", "メモ", "読書", "旅行", "料理", "note", "Python", "Markdown", "export")
+
+
+def _sentence(rng: random.Random) -> str:
+    return "".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 12))) + "。"
+
+
+def _paragraph(rng: random.Random) -> str:
+    return f"<p>{_sentence(rng)}<br>{_sentence(rng)}</p>"
+
+
+def _heading(rng: random.Random) -> str:
+    level = rng.randint(2, 4)
+    return f"<h{level}>{rng.choice(_WORDS)}{rng.choice(_WORDS)}</h{level}>"
+
+
+def _list(rng: random.Random) -> str:
+    items = "".join(f"<li>{rng.choice(_WORDS)}</li>" for _ in range(rng.randint(2, 5)))
+    return f"<ul>{items}</ul>"
+
+
+def _bold(rng: random.Random) -> str:
+    tag = rng.choice(("b", "strong"))
+    return f"<p><{tag}>{rng.choice(_WORDS)}</{tag}>と{_sentence(rng)}</p>"
+
+
+def _link(rng: random.Random) -> str:
+    return f'<p><a href="https://note.com/example/n/n{rng.getrandbits(32):08x}">{rng.choice(_WORDS)}</a></p>'
+
+
+def _figure(rng: random.Random) -> str:
+    return (
+        f'<figure><img src="https://assets.st-note.com/img/{rng.getrandbits(48):012x}.png" alt="">'
+        f"<figcaption>{rng.choice(_WORDS)}</figcaption></figure>"
+    )
+
+
+def _escapes(rng: random.Random) -> str:
+    # エクスポートに稀に残っている \uXXXX 形式のエスケープと文字参照
+    escaped = "".join(f"\\u{ord(c):04x}" for c in rng.choice(_WORDS))
+    return f"<p>{escaped} &amp; &lt;{rng.choice(_WORDS)}&gt;</p>"
+
+
+TAG_MIXES: dict[str, tuple[Callable[[random.Random], str], ...]] = {
+    "plain": (_paragraph,),
+    "rich": (_paragraph, _paragraph, _heading, _list, _bold, _link, _figure),
+    "escapes": (_paragraph, _escapes, _escapes, _bold),
+}
+
+
+def make_html(rng: random.Random, size: int, tags: str) -> str:
+    """Return an article body of about size UTF-8 bytes built from the blocks of the tag mix."""
+    blocks = TAG_MIXES[tags]
+    parts = []
+    produced = 0
+    while produced < size:
+        block = rng.choice(blocks)(rng)
+        parts.append(block)
+        produced += len(block.encode("utf-8"))
+    return "".join(parts)
+
+
+def format_pub_date(dt: datetime) -> str:
+    """RFC 822 date as Note writes it, independent of the locale."""
+    offset = int(dt.utcoffset().total_seconds()) // 60
+    sign = "+" if offset >= 0 else "-"
+    return (
+        f"{_DAYS[dt.weekday()]}, {dt.day:02d} {_MONTHS[dt.month - 1]} {dt.year} "
+        f"{dt:%H:%M:%S} {sign}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+    )
+
+
+def write_export(
+    path: str,
+    items: int,
+    html_size: int = 2048,
+    encoding: str = "utf-8",
+    tags: str = "rich",
+    seed: int = 0,
+) -> None:
+    """
+    Write a synthetic Note RSS export: items newest first, each body about html_size bytes
+    drawn from the tag mix, encoded with one of ENCODINGS.
+    """
+    codec, declared = ENCODINGS[encoding]
+    rng = random.Random(seed)
+    dt = datetime(2026, 2, 11, 14, 50, 38, tzinfo=timezone(timedelta(hours=9)))
+    with open(path, "w", encoding=codec, newline="\n") as f:
+        f.write(f'<?xml version="1.0" encoding="{declared}"?>\n')
+        f.write('<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>\n')
+        f.write("<title>synthetic</title>\n")
+        for i in range(items):
+            # 最大 ±20% のばらつきを持たせる
+            size = max(1, int(html_size * rng.uniform(0.8, 1.2)))
+            f.write(
+                f"<item><title>{rng.choice(_WORDS)} {i}</title>"
+                f"<link>https://note.com/example/n/n{i:08x}</link>"
+                f"<pubDate>{format_pub_date(dt)}</pubDate>"
+                f"<content:encoded><![CDATA[{make_html(rng, size, tags)}]]></content:encoded></item>\n"
+            )
+            dt -= timedelta(seconds=rng.randint(60, 3 * 86400))
+        f.write("</channel></rss>\n")
+
+
+def add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--items", type=int, default=2000, help="Number of <item> elements")
+    parser.add_argument("--html-size", type=int, default=2048, help="Average article HTML size in bytes")
+    parser.add_argument("--encoding", choices=list(ENCODINGS), default="utf-8", help="Encoding of the export")
+    parser.add_argument("--tags", choices=list(TAG_MIXES), default="rich", help="Mix of HTML blocks in the articles")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same file)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic Note RSS export")
+    parser.add_argument("output", help="Path of the XML file to write")
+    add_export_arguments(parser)
+    args = parser.parse_args()
+    write_export(args.output, args.items, args.html_size, args.encoding, args.tags, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+html_to_markdown の変換結果を保存する永続キャッシュ。
+
+content:encoded の内容と変換器のバージョンのハッシュをキーとし、1つの SQLite ファイルに保存します。
+合計サイズが上限を超えると、最後に使われた時刻が古いものから削除します (LRU)。
+合計サイズは stats の "bytes" の行にトリガーで増減させて保持するため、書き込みのたびに全体を数え直すことはありません。
+複数のワーカープロセスから同じファイルを開いて使うことができます。
+"""
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_STAT_NAMES = ("hits", "misses", "evictions")
+# キャッシュ全体の value のバイト数 (entries の挿入・更新・削除でトリガーが増減させる)
+_TOTAL_BYTES = "bytes"
+
+# プロセス・スレッドごとに開いたキャッシュ (ワーカープロセスで使い回す)
+_open_caches: dict[tuple[str, str, int], "ConversionCache"] = {}
+
+
+class ConversionCache:
+    """Single-file, size-capped LRU store of converted Markdown keyed by content hash"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, namespace: str = ""):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.namespace = namespace.encode("utf-8")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._touched: dict[bytes, int] = {}
+        self._inserted: dict[bytes, str] = {}
+        self._prefetched: Optional[dict[bytes, str]] = None
+
+        import sqlite3  # キャッシュを使うときだけ読み込む
+
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key BLOB PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.executemany("INSERT OR IGNORE INTO stats VALUES (?, 0)", [(name,) for name in _STAT_NAMES])
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN "
+                f"UPDATE stats SET value = value + NEW.size WHERE name = '{_TOTAL_BYTES}'; END"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN "
+                f"UPDATE stats SET value = value + NEW.size - OLD.size WHERE name = '{_TOTAL_BYTES}'; END"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN "
+                f"UPDATE stats SET value = value - OLD.size WHERE name = '{_TOTAL_BYTES}'; END"
+            )
+            # 合計のないキャッシュ (以前のバージョンで作ったもの) は一度だけ数える
+            if self.conn.execute("SELECT 1 FROM stats WHERE name = ?", (_TOTAL_BYTES,)).fetchone() is None:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO stats SELECT ?, COALESCE(SUM(size), 0) FROM entries", (_TOTAL_BYTES,)
+                )
+
+    def key(self, html_content: str) -> bytes:
+        return hashlib.sha256(self.namespace + b"\0" + html_content.encode("utf-8")).digest()
+
+    def prefetch(self, html_contents: list[str]) -> None:
+        """Load the entries for a batch with one query instead of one query per get()"""
+        keys = [self.key(html_content) for html_content in html_contents]
+        self._prefetched = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self._prefetched.update(
+                self.conn.execute(f"SELECT key, value FROM entries WHERE key IN ({placeholders})", chunk).fetchall()
+            )
+
+    def get(self, html_content: str) -> Optional[str]:
+        key = self.key(html_content)
+        value = self._inserted.get(key)
+        if value is None and self._prefetched is not None:
+            value = self._prefetched.get(key)
+        elif value is None:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            value = row[0] if row else None
+        if value is None:
+            self.misses += 1
+            self._pending_misses += 1
+            return None
+        self.hits += 1
+        self._pending_hits += 1
+        self._touched[key] = time.time_ns()
+        return value
+
+    def put(self, html_content: str, markdown: str) -> None:
+        self._inserted[self.key(html_content)] = markdown
+
+    def wrap(self, html_converter: Callable[[str], str]) -> Callable[[str], str]:
+        """Return a converter that consults the cache before calling html_converter"""
+
+        def cached_converter(html_content: str) -> str:
+            markdown = self.get(html_content)
+            if markdown is None:
+                markdown = html_converter(html_content)
+                self.put(html_content, markdown)
+            return markdown
+
+        return cached_converter
+
+    def commit(self) -> None:
+        """Write pending inserts and LRU updates, then evict down to max_bytes"""
+        now = time.time_ns()
+        evicted = 0
+        with self.conn:
+            # INSERT OR REPLACE は置き換えた行の削除トリガーを呼ばないため、既存の行は UPDATE する
+            self.conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, last_used = excluded.last_used",
+                [(key, value, len(value.encode("utf-8")), now) for key, value in self._inserted.items()],
+            )
+            self.conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            total = self.conn.execute("SELECT value FROM stats WHERE name = ?", (_TOTAL_BYTES,)).fetchone()[0]
+            if total > self.max_bytes:
+                victims = []
+                for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                self.conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+                evicted = len(victims)
+            self.conn.executemany(
+                "UPDATE stats SET value = value + ? WHERE name = ?",
+                [(self._pending_hits, "hits"), (self._pending_misses, "misses"), (evicted, "evictions")],
+            )
+        self.evictions += evicted
+        self._inserted.clear()
+        self._prefetched = None
+        self._touched.clear()
+        self._pending_hits = 0
+        self._pending_misses = 0
+
+    def read_stats(self) -> dict[str, int]:
+        """Counters accumulated in the file by every process that used it"""
+        return dict(self.conn.execute("SELECT name, value FROM stats WHERE name != ?", (_TOTAL_BYTES,)).fetchall())
+
+    def close(self) -> None:
+        self.commit()
+        self.conn.close()
+
+
+def open_cache(path: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, namespace: str = "") -> ConversionCache:
+    """Open a cache once per process and thread and reuse it (used by worker processes and --batch threads)"""
+    cache_key = (path, namespace, threading.get_ident())
+    cache = _open_caches.get(cache_key)
+    if cache is None:
+        cache = _open_caches[cache_key] = ConversionCache(path, max_bytes, namespace)
+    return cache
@@ -1,14 +1,32 @@
 import argparse
+import glob
+import io
 import os
+import sys
+import time
+from collections import deque
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Iterable, Iterator, Optional
 import json
 import contextlib
 
 from xml_to_markdown_converter import (
-    get_system_language, t, select_xml_file, load_xml, extract_text_content
+    get_system_language, set_language, t, select_xml_file, iter_items, HTML_CONVERTERS,
+    extract_entry_fields, extract_entry_identity, convert_entries, parse_pub_date, iter_unprocessed_entries, cache_namespace, STDIN_PATH, MMAP_THRESHOLD,
+    EXPORT_SUFFIXES
+)
+from conversion_cache import DEFAULT_CACHE_MAX_BYTES, open_cache
+from external_sort import SORT_BUFFER_BYTES, external_sort, remove_stale_runs
+from pipeline import Pipeline
+from seen_index import SEEN_INDEX_FILE, SeenIndex, entry_key
+from watch_folder import file_signature, open_watcher, scan_inbox
+from profiling import DEFAULT_SLOWEST_ENTRIES, NULL_PROFILE, Profile, write_profile_report
+from split_markdown_file import (
+    split_and_save_markdown, rebuild_manifest, manifest_filename, load_manifest, append_manifest, save_manifest,
+    entry_record, load_entry_index, rebuild_entry_index, save_entry_index, read_entry, rewrite_entries,
+    write_last_entry_time, start_resume_journal, append_resume_journal, load_resume_journal,
+    LAST_ENTRY_TIME_FILE, RESUME_JOURNAL_FILE, CommitCallback
 )
-from split_markdown_file import split_and_save_markdown, LAST_ENTRY_TIME_FILE
 
 
 def load_json(filepath: str) -> list[dict[str, Any]]:
@@ -25,72 +43,867 @@ def load_json(filepath: str) -> list[dict[str, Any]]:
             return []
 
 
-def main() -> None:
+def iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+    """Group an iterable into lists of at most batch_size items"""
+    batch: list[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def record_entry_timings(
+    batch: list[tuple[str, str, str]], results: list[tuple[datetime, str, float]], profile: Profile
+) -> Iterator[tuple[datetime, str]]:
+    """Pass the results of convert_entries(timed=True) on as (datetime, Markdown), recording the timings"""
+    for (pub_date, title, html_content), (dt, text, seconds) in zip(batch, results):
+        profile.entry(seconds, pub_date, title)
+        if text and not html_content.strip():
+            profile.count("empty")
+        yield dt, text
+
+
+def iter_converted_entries(
+    entries: Iterable[tuple[str, str, str]],
+    last_entry_time_loaded: datetime,
+    html_engine: str = "tokenizer",
+    workers: int = 1,
+    batch_size: int = 64,
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    executor: Any = None,
+    profile: Profile = NULL_PROFILE,
+) -> Iterator[tuple[datetime, str]]:
+    """
+    Convert extract_entry_fields() tuples to (datetime, Markdown) pairs in feed order.
+    With workers > 1 the entries are sent to a process pool in batches of plain
+    (pubDate, title, HTML) tuples; only a bounded number of batches is in flight.
+    An existing executor (e.g. shared by --batch) is used instead of starting a new pool.
+    With an enabled profile, the conversion time of every entry is measured where it runs.
+    """
+    timed = profile.enabled
+    convert_args = (last_entry_time_loaded, html_engine, cache_path, cache_max_bytes, timed)
+    if workers <= 1:
+        for batch in iter_batches(entries, batch_size):
+            results = convert_entries(batch, *convert_args)
+            yield from record_entry_timings(batch, results, profile) if timed else results
+        return
+
+    # プロセスプールを使うときだけ読み込む (起動時間の短縮)
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        in_flight: deque[tuple[list[tuple[str, str, str]], Future]] = deque()
+
+        def next_results() -> Iterable[tuple[datetime, str]]:
+            batch, future = in_flight.popleft()
+            results = future.result()
+            return record_entry_timings(batch, results, profile) if timed else results
+
+        for batch in iter_batches(entries, batch_size):
+            in_flight.append((batch, executor.submit(convert_entries, batch, *convert_args)))
+            # 先頭のバッチから順に結果を返すことで、出力順序をフィード順に保つ
+            if len(in_flight) >= workers * 2:
+                yield from next_results()
+        while in_flight:
+            yield from next_results()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Convert XML notes to Markdown for NotebookLM")
     parser.add_argument(
         "--output_file",
         metavar="FILE",
-        type="str",
+        type=str,
         default="Notebook_Notes.md",
         help="Path to output Markdown file",
     )
+    parser.add_argument(
+        "--input",
+        metavar="PATH",
+        help="XML export to convert ('-' reads standard input); the file dialog is shown only when omitted",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="DIR_OR_GLOB",
+        help="Convert every export in a directory (*.xml) or matching a glob; each gets its own output directory",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Exports converted at the same time in --batch mode, each in its own process (default: CPU count)",
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="INBOX",
+        help="Keep running and convert every export saved into INBOX incrementally into --output_file (Ctrl+C stops)",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Polling interval of --watch when inotify is not available",
+    )
     parser.add_argument("--limit", type=int, default=1500000, help="Split file size limit in bytes")
+    parser.add_argument(
+        "--pack-window",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Pack entries into fewer, fuller files (first-fit decreasing over the next N entries); 0 splits in feed order",
+    )
+    parser.add_argument(
+        "--html-engine",
+        choices=sorted(HTML_CONVERTERS),
+        default="tokenizer",
+        help="HTML to Markdown converter (regex is the previous implementation, kept for comparison)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for HTML conversion (1 = convert in this process)",
+    )
+    parser.add_argument("--batch-size", type=int, default=64, help="Entries sent to a worker at a time")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Read, convert and write in separate threads connected by bounded queues, and report their utilization",
+    )
+    parser.add_argument(
+        "--mmap-threshold",
+        type=int,
+        default=MMAP_THRESHOLD,
+        metavar="BYTES",
+        help="Memory-map exports of at least this size instead of reading them (0 never maps)",
+    )
+    parser.add_argument("--lang", help="Message language (e.g. ja, en); overrides the OS setting and NOTE_MD_LANG")
+    parser.add_argument(
+        "--chronological",
+        action="store_true",
+        help="Write the entries oldest first (sorted by pubDate) instead of in feed order",
+    )
+    parser.add_argument(
+        "--sort-buffer",
+        type=int,
+        default=SORT_BUFFER_BYTES,
+        metavar="BYTES",
+        help="Memory for the entries held by --chronological (their strings and sort records); beyond this, sorted "
+        "runs are spilled next to the output and merged",
+    )
+    parser.add_argument(
+        "--seen-index",
+        action="store_true",
+        help=f"Skip entries already written (by guid/link and content hash, recorded in {SEEN_INDEX_FILE} next to "
+        "last_entry_time.txt) instead of by date, so older posts that are new or edited are written too",
+    )
+    parser.add_argument("--cache", metavar="FILE", help="Persistent conversion cache file (SQLite)")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help="Conversion cache size limit in bytes (least recently used entries are evicted)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Stop reading a newest-first feed at the first already processed entry (falls back to a full scan if unsorted)",
+    )
+    parser.add_argument(
+        "--lookup",
+        metavar="QUERY",
+        help="Print the entries of --output_file whose date (e.g. 2026/02/11) or title contains QUERY, or whose hash is QUERY",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Convert the whole input again and split it anew from the first shard, replacing only the shards "
+        "whose content changed (unchanged files keep their mtime) and removing leftover shards",
+    )
+    parser.add_argument(
+        "--rebuild-changed",
+        action="store_true",
+        help="Convert every entry of the input again and rewrite only the shards holding entries whose Markdown changed",
+    )
+    parser.add_argument(
+        "--repair-manifest",
+        action="store_true",
+        help="Rebuild the shard manifest of --output_file (or of every --batch export) from the files on disk and exit",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write a JSON report of per-stage wall/CPU time, entry counts, bytes and the slowest entries",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_SLOWEST_ENTRIES,
+        metavar="N",
+        help="Number of slowest entries (by conversion time) listed in the --profile report",
+    )
+    return parser
 
-    args = parser.parse_args()
-    output_md_filename: str = args.output_file
-    md_file_size_limit: int = args.limit
 
-    input_xml_filename = select_xml_file()
-    if not input_xml_filename:
-        print("XMLファイルが選択されませんでした。処理を中断します。")
-        return
+def entry_sort_key(fields: tuple[str, str, str]) -> datetime:
+    """Sort key of --chronological: the pubDate (entries without a valid one come first)"""
+    return (parse_pub_date(fields[0]) if fields[0] else None) or datetime.min.replace(tzinfo=timezone.utc)
 
-    try:
-        print(t("start_processing", input_xml_filename))
 
-        root_element = load_xml(input_xml_filename)
-        if root_element is None:
-            return
+# external_sort のバッファの1件分の、文字列以外の大きさ ((キー, 番号, 要素) と要素のタプル、日時のキー、番号、リストの参照)
+_SORT_RECORD_OVERHEAD = 2 * sys.getsizeof((None, None, None)) + sys.getsizeof(datetime.min) + sys.getsizeof(1 << 40) + 8
+
+
+def entry_size(fields: tuple[str, str, str]) -> int:
+    """Memory held by one entry in the --chronological sort buffer, in bytes (not characters)"""
+    return sys.getsizeof(fields[0]) + sys.getsizeof(fields[1]) + sys.getsizeof(fields[2]) + _SORT_RECORD_OVERHEAD
+
+
+def read_last_entry_time(last_entry_time_file: str = LAST_ENTRY_TIME_FILE) -> datetime:
+    """Read the resume checkpoint (datetime.min if there is none)"""
+    last_entry_time_loaded: datetime = datetime.min.replace(tzinfo=timezone.utc)
+    if os.path.exists(last_entry_time_file):
+        with open(last_entry_time_file, encoding="utf-8") as f:
+            time_str = f.read().strip()
+            with contextlib.suppress(ValueError):
+                last_entry_time_loaded = datetime.fromisoformat(time_str)
+    return last_entry_time_loaded
+
+
+class ResumeJournal:
+    """
+    Resume bookkeeping of one convert_file run. Positions number the entries that reach conversion
+    (after the incremental filter and the --chronological sort); every shard commit journals how many
+    of them it covers, so a killed run skips them without converting them again.
+    """
+
+    def __init__(self, journal_file: Optional[str], resume: Optional[dict[str, Any]]):
+        self.journal_file = journal_file
+        self.continue_last_shard = resume is not None and resume["shard"] is not None
+        # 前回の実行で確定済みのエントリ: 先頭 consumed 件と、それ以降の extra の位置 (詰め直しモード)
+        self.skip_entries = resume["consumed"] if resume else 0
+        self.skip_extra: set[int] = set(resume.get("extra", ())) if resume else set()
+        self.consumed = self.skip_entries
+        self.last: Optional[str] = resume["last"] if resume else None
+        self.shards_committed = 0
+        self.considered = 0  # 差分読み込みで除外されずに残ったエントリ数 (確定済みのものを含む)
+        self.written = 0
+        self.newest_written: Optional[datetime] = None  # 書き込んだ中で最も新しい日時 (確定済みのものを含む)
+        self.fed_positions: deque[int] = deque()  # 変換に渡したエントリの位置 (変換結果は同じ順で返ってくる)
+        # 書き込んだエントリのうち、まだ確定していないもの (書き込み順の番号 -> 位置, 日時)
+        self.pending: dict[int, tuple[int, datetime]] = {}
+
+    @classmethod
+    def open(
+        cls,
+        input_xml_filename: str,
+        base_name: str,
+        args: argparse.Namespace,
+        last_entry_time_file: str,
+        last_entry_time_loaded: datetime,
+        seen_index: Optional[SeenIndex],
+    ) -> "ResumeJournal":
+        """
+        Resume the interrupted run of the same input and options, or start a new journal.
+        Raises ValueError if an interrupted run of another input or other options committed shards.
+        """
+        journal_file = os.path.join(os.path.dirname(last_entry_time_file), RESUME_JOURNAL_FILE)
+        if args.rebuild:
+            # 分割し直すので、中断された追記の実行は再開しない (中断された場合は --rebuild をやり直す)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(journal_file)
+            return cls(None, None)
+
+        input_stat = os.stat(input_xml_filename) if input_xml_filename != STDIN_PATH else None
+        identity = {
+            "input": os.path.abspath(input_xml_filename) if input_stat is not None else STDIN_PATH,
+            "size": input_stat.st_size if input_stat is not None else None,
+            "mtime_ns": input_stat.st_mtime_ns if input_stat is not None else None,
+            "output": os.path.abspath(base_name),
+            "start": last_entry_time_loaded.isoformat(),
+            "incremental": args.incremental,
+            "html_engine": args.html_engine,
+            "limit": args.limit,
+            "pack_window": args.pack_window,
+            "seen_index": seen_index.size if seen_index is not None else None,
+            "chronological": args.chronological,
+        }
+        # 標準入力は同じ入力か判定できないので再開しないが、確定したファイルは記録する
+        resume = load_resume_journal(
+            journal_file,
+            identity if input_stat is not None else None,
+            os.path.dirname(os.path.abspath(base_name)),
+        )
+        if resume is None:
+            start_resume_journal(journal_file, identity)
+        else:
+            print(t("resume_from_journal", resume["consumed"] + len(resume.get("extra", ()))))
+            if resume["shard"] is not None:
+                # 置き換え後、マニフェストに記録する前に中断された場合に備えて記録し直す
+                append_manifest(base_name, resume["shard"])
+        return cls(journal_file, resume)
 
-        channel_element = root_element.find("channel")
-        if channel_element is None:
-            print(t("error_occurred", "No <channel> element found in XML."))
+    @property
+    def before_commit(self) -> Optional[CommitCallback]:
+        return self.commit if self.journal_file is not None else None
+
+    @property
+    def committed_any(self) -> bool:
+        """Whether shards of this run (or of the run it resumes) are already committed"""
+        return self.shards_committed > 0 or self.continue_last_shard
+
+    def unconverted(self, entries: Iterable[tuple[str, str, str]]) -> Iterator[tuple[str, str, str]]:
+        """Skip the entries committed by the interrupted run (read only, never converted) and note the positions"""
+        for position, entry in enumerate(entries):
+            self.considered = position + 1
+            if position < self.skip_entries or position in self.skip_extra:
+                self._note_time(parse_pub_date(entry[0]) if entry[0] else None)
+                continue
+            self.fed_positions.append(position)
+            yield entry
+
+    def converted(self) -> int:
+        """Position of the next conversion result"""
+        return self.fed_positions.popleft()
+
+    def note_written(self, position: int, dt: datetime) -> None:
+        """Record an entry handed to the writer (in the writing thread, as commit)"""
+        self._note_time(dt)
+        if self.journal_file is not None:
+            self.pending[self.written] = (position, dt)
+        self.written += 1
+
+    def commit(self, committed_prefix: int, committed_extra: list[int], shard: dict[str, Any]) -> None:
+        """before_commit callback: journal which conversion inputs the committed shards cover"""
+        self.shards_committed += 1
+        if self.journal_file is None:
             return
+        while self.pending:
+            index = next(iter(self.pending))
+            if index >= committed_prefix:
+                break
+            position, dt = self.pending.pop(index)
+            self.consumed, self.last = position + 1, dt.isoformat()
+        extra = {self.pending[index][0] for index in committed_extra}
+        extra.update(position for position in self.skip_extra if position >= self.consumed)
+        append_resume_journal(self.journal_file, {
+            "consumed": self.consumed,
+            "extra": sorted(extra),
+            "last": self.last,
+            "shard": dict(shard),
+        })
+
+    def finish(self) -> None:
+        """The run completed: the next one starts as a new run"""
+        if self.journal_file is not None:
+            os.remove(self.journal_file)
 
-        entries = channel_element.findall("item")
+    def _note_time(self, dt: Optional[datetime]) -> None:
+        if dt is not None and (self.newest_written is None or dt > self.newest_written):
+            self.newest_written = dt
 
-        print(t("extracted_entries", len(entries), len(entries)))
-        print(t("converting_markdown"))
 
-        last_entry_time_loaded: datetime = datetime.min.replace(tzinfo=timezone.utc)
-        last_entry_time_processed: datetime = datetime.min.replace(tzinfo=timezone.utc)
-        if os.path.exists(LAST_ENTRY_TIME_FILE):
-            with open(LAST_ENTRY_TIME_FILE, encoding="utf-8") as f:
-                time_str = f.read().strip()
-                with contextlib.suppress(ValueError):
-                    last_entry_time_loaded = datetime.fromisoformat(time_str)
+def convert_file(
+    input_xml_filename: str,
+    output_md_filename: str,
+    args: argparse.Namespace,
+    last_entry_time_file: str = LAST_ENTRY_TIME_FILE,
+    executor: Any = None,
+    profile: Profile = NULL_PROFILE,
+) -> dict[str, Any]:
+    """
+    Convert one export into its shard set and update its resume checkpoint (a killed run resumes
+    after its last committed shard, see ResumeJournal). Returns a summary (entries read/written,
+    shard files, input bytes, seconds), with the profile report under "profile" when it is enabled.
+    """
+    started = time.perf_counter()
+    print(t("start_processing", input_xml_filename))
+    print(t("converting_markdown"))
 
-        markdown_output_texts = []
-        for entry_element in entries:
-            dt, text = extract_text_content(entry_element, last_entry_time_loaded)
+    last_entry_time_loaded = read_last_entry_time(last_entry_time_file)
+    last_entry_time_processed = last_entry_time_loaded  # 何も書き込まなかった場合はそのまま
+    # 変換するエントリを日時で選ぶ基準 (--seen-index ではインデックスで選び、--rebuild では全て変換する)
+    convert_after = last_entry_time_loaded
+    seen_index: Optional[SeenIndex] = None
+    if args.seen_index:
+        seen_index = SeenIndex(os.path.join(os.path.dirname(last_entry_time_file), SEEN_INDEX_FILE))
+        # インデックスのない既存の出力に初めて使う場合は、今回だけ日時でも判定する (書き込み済みのエントリも登録される)
+        if seen_index.size > 0 or last_entry_time_loaded == datetime.min.replace(tzinfo=timezone.utc):
+            convert_after = datetime.min.replace(tzinfo=timezone.utc)
+    if args.rebuild:
+        convert_after = datetime.min.replace(tzinfo=timezone.utc)
+
+    base_name, ext = os.path.splitext(output_md_filename)
+    journal = ResumeJournal.open(
+        input_xml_filename, base_name, args, last_entry_time_file, last_entry_time_loaded, seen_index
+    )
+
+    # <item> を1件ずつ読み込み、変換後すぐに要素を解放する
+    entry_count = 0
+    skipped_count = 0  # 処理済みのため変換結果が空だったエントリ数
+    unseen_keys: list[bytes] = []  # --seen-index: インデックスになかったエントリ (完了時に登録する)
+
+    def counted_entries() -> Iterator[tuple[str, str, str]]:
+        nonlocal entry_count
+        for entry_element in iter_items(input_xml_filename, profile, args.mmap_threshold):
+            entry_count += 1
+            fields = extract_entry_fields(entry_element)
+            if seen_index is not None:
+                # HTML を変換する前に、書き込み済みのエントリを除く
+                key = entry_key(extract_entry_identity(entry_element) or fields[0], fields[1], fields[2])
+                if key in seen_index and not args.rebuild:
+                    continue
+                unseen_keys.append(key)
+            yield fields
+
+    def converted_entries(entries: Iterable[tuple[str, str, str]]) -> Iterator[tuple[int, datetime, str]]:
+        """Convert and drop the already processed entries, as (position, datetime, Markdown)"""
+        nonlocal skipped_count
+        for dt, text in iter_converted_entries(
+            journal.unconverted(entries),
+            convert_after,
+            args.html_engine,
+            args.workers,
+            args.batch_size,
+            args.cache,
+            args.cache_size,
+            executor,
+            profile,
+        ):
+            position = journal.converted()
             if text == "":
+                skipped_count += 1
                 continue
-            last_entry_time_processed = dt
-            markdown_output_texts.append(text)
-        
-        base_name, ext = os.path.splitext(output_md_filename)
+            yield position, dt, text
 
-        total_files_written = split_and_save_markdown(
-            markdown_output_texts,
-            base_name,
-            ext,
-            md_file_size_limit,
-            last_entry_time_processed
+    # --pipeline: 読み込み・変換をそれぞれ別スレッドで動かし、書き出し (このスレッド) と並行させる
+    pipeline = Pipeline(args.batch_size) if args.pipeline else None
+
+    def new_entries() -> Iterator[tuple[datetime, str]]:
+        entries: Iterable[tuple[str, str, str]] = profile.timed(counted_entries(), "parse")
+        if args.incremental and seen_index is None and not args.rebuild:
+            entries = profile.timed(iter_unprocessed_entries(entries, last_entry_time_loaded), "filter")
+        if args.chronological:
+            # 変換する前に並べ替えるので、再開用の位置も並べ替えた後の順番になる
+            # (一時ファイルは tmpfs かもしれない既定の一時ディレクトリではなく出力先に作る)
+            output_dir = os.path.dirname(os.path.abspath(base_name))
+            remove_stale_runs(output_dir)
+            entries = profile.timed(
+                external_sort(
+                    entries,
+                    entry_sort_key,
+                    entry_size,
+                    args.sort_buffer,
+                    output_dir,
+                    lambda run_size: profile.count("sort_runs"),
+                ),
+                "sort",
+            )
+        if pipeline is None:
+            converted = profile.timed(converted_entries(entries), "convert")
+        else:
+            reader = pipeline.stage(entries, "read")
+            converter = pipeline.stage(profile.timed(converted_entries(profile.timed(reader, "wait")), "convert"), "convert")
+            converted = profile.timed(converter, "wait")
+        # 確定待ちの記録は書き出すスレッドで行う (journal.commit と同じスレッド)
+        for position, dt, text in converted:
+            journal.note_written(position, dt)
+            yield dt, text
+
+    output_bytes_before = 0
+    if profile.enabled:
+        output_bytes_before = sum(shard["bytes"] for shard in load_manifest(base_name) or [])
+
+    # 読み込み・変換・分割をジェネレーターで連結し、ファイルが埋まるごとに書き出す
+    try:
+        with profile.stage("write"):
+            total_files_written = split_and_save_markdown(
+                new_entries(),
+                base_name,
+                ext,
+                args.limit,
+                last_entry_time_file=last_entry_time_file,
+                before_commit=journal.before_commit,
+                continue_last_shard=journal.continue_last_shard,
+                pack_window=args.pack_window,
+                rebuild=args.rebuild,
+            )
+    except ValueError:
+        if journal.committed_any:
+            # 途中で切れたエクスポートは同じ入力で再開できないので、確定済みのファイルの扱いを案内する
+            print(t("aborted_after_commit"))
+        raise
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+    if journal.newest_written is not None:
+        # split_and_save_markdown は今回書き込んだ分の最も新しい日時を記録する。前回の実行で確定した分も含め、
+        # 元のチェックポイントより前には戻さない (--seen-index や --rebuild では古い日時のエントリも書き込まれる)
+        last_entry_time_processed = max(journal.newest_written, last_entry_time_processed)
+        write_last_entry_time(last_entry_time_processed, last_entry_time_file)
+    if seen_index is not None:
+        seen_index.add(unseen_keys)
+        print(t("seen_index_skipped", entry_count - len(unseen_keys), len(seen_index)))
+    journal.finish()
+    utilization = pipeline.utilization("write") if pipeline is not None else None
+    if utilization is not None:
+        print(t("pipeline_utilization", *(utilization[name] * 100 for name in ("read", "convert", "write"))))
+    print(t("extracted_entries", entry_count, entry_count))
+    print(t("processing_complete", last_entry_time_loaded, last_entry_time_processed, total_files_written))
+    summary = {
+        "input": input_xml_filename,
+        "entries": entry_count,
+        "written": journal.written,
+        "files": total_files_written,
+        "bytes": os.path.getsize(input_xml_filename) if input_xml_filename != STDIN_PATH else 0,
+        "seconds": time.perf_counter() - started,
+    }
+    if profile.enabled:
+        fed_count = journal.written + skipped_count
+        profile.count("seen", entry_count)
+        profile.count("already_processed", entry_count - journal.considered + skipped_count)
+        profile.count("resumed", journal.considered - fed_count)
+        profile.count("converted", journal.written)
+        profile.count("empty", 0)  # 本文のないエントリ (record_entry_timings で数える)
+        summary["profile"] = profile.report(
+            input=input_xml_filename,
+            output=output_md_filename,
+            options={
+                name: getattr(args, name)
+                for name in (
+                    "html_engine", "workers", "batch_size", "pipeline", "limit", "pack_window", "incremental", "seen_index",
+                    "chronological", "rebuild", "cache",
+                )
+            },
+            bytes_in=summary["bytes"] if input_xml_filename != STDIN_PATH else None,
+            bytes_out=sum(shard["bytes"] for shard in load_manifest(base_name) or []) - output_bytes_before,
+            files=total_files_written,
+            pipeline_utilization=utilization,
         )
+    return summary
+
+
+def find_exports(pattern: str) -> list[str]:
+    """
+    Expand a --batch argument: a directory means every export in it (*.xml and the compressed
+    *.xml.gz, *.xml.bz2, *.xml.xz, *.zip), anything else is a glob
+    """
+    if os.path.isdir(pattern):
+        paths = {path for suffix in EXPORT_SUFFIXES for path in glob.glob(os.path.join(pattern, "*" + suffix))}
+    else:
+        paths = set(glob.glob(pattern))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def batch_output_filename(input_xml_filename: str, output_file: str) -> str:
+    """Output file of one --batch export: <output dir>/<export name>/<output name>"""
+    output_dir, output_name = os.path.split(output_file)
+    export_name = os.path.basename(input_xml_filename)
+    for suffix in sorted(EXPORT_SUFFIXES, key=len, reverse=True):
+        if export_name.lower().endswith(suffix):
+            export_name = export_name[:-len(suffix)]
+            break
+    else:
+        export_name = os.path.splitext(export_name)[0]
+    return os.path.join(output_dir, export_name, output_name)
+
+
+def print_batch_summary(summaries: list[dict[str, Any]], elapsed: float) -> None:
+    for summary in summaries:
+        seconds = max(summary["seconds"], 1e-9)
+        print(t(
+            "batch_file_summary",
+            summary["input"],
+            summary["entries"],
+            summary["written"],
+            summary["files"],
+            summary["seconds"],
+            summary["entries"] / seconds,
+            summary["bytes"] / seconds / (1 << 20),
+        ))
+    total_entries = sum(summary["entries"] for summary in summaries)
+    total_bytes = sum(summary["bytes"] for summary in summaries)
+    elapsed = max(elapsed, 1e-9)
+    print(t(
+        "batch_total_summary",
+        len(summaries),
+        total_entries,
+        sum(summary["written"] for summary in summaries),
+        elapsed,
+        total_entries / elapsed,
+        total_bytes / elapsed / (1 << 20),
+    ))
+
+
+def new_profile(args: argparse.Namespace) -> Profile:
+    """A fresh Profile for one export with --profile, otherwise the no-op NULL_PROFILE"""
+    return Profile(args.profile_top) if args.profile else NULL_PROFILE
+
+
+def convert_batch_export(input_xml_filename: str, args: argparse.Namespace) -> tuple[Optional[dict[str, Any]], str]:
+    """
+    Convert one export of a --batch run (in a process of the batch pool). Returns its summary
+    (None if it failed) and everything it printed, which the parent prints as one block.
+    """
+    if args.lang:
+        set_language(args.lang)  # spawn で起動されたプロセスには親の設定が引き継がれない
+    log = io.StringIO()
+    summary: Optional[dict[str, Any]] = None
+    with contextlib.redirect_stdout(log):
+        output_md_filename = batch_output_filename(input_xml_filename, args.output_file)
+        target_dir = os.path.dirname(output_md_filename)
+        os.makedirs(target_dir, exist_ok=True)
+        try:
+            summary = convert_file(
+                input_xml_filename,
+                output_md_filename,
+                args,
+                os.path.join(target_dir, LAST_ENTRY_TIME_FILE),
+                profile=new_profile(args),
+            )
+        except Exception as e:
+            print(t("error_occurred", f"{input_xml_filename}: {e}"))
+    return summary, log.getvalue()
+
+
+def convert_batch(pattern: str, args: argparse.Namespace) -> list[dict[str, Any]]:
+    """
+    Convert several exports, --jobs of them at a time, each in its own process. Every export gets
+    its own directory (<output dir>/<export name>/) holding its shards and last_entry_time.txt,
+    while the conversion cache is shared by all of them. The messages of each export are printed
+    together when it finishes. Returns the summaries of the exports converted successfully.
+    """
+    exports = find_exports(pattern)
+    if not exports:
+        print(t("file_not_found", pattern))
+        return []
+
+    # 圧縮前後のファイルなど出力先が同じになるエクスポートは、最初の1つだけを変換する
+    export_by_output: dict[str, str] = {}
+    for input_xml_filename in exports:
+        output_md_filename = batch_output_filename(input_xml_filename, args.output_file)
+        if output_md_filename in export_by_output:
+            print(t("batch_duplicate_export", input_xml_filename, export_by_output[output_md_filename]))
+        else:
+            export_by_output[output_md_filename] = input_xml_filename
+    exports = list(export_by_output.values())
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    started = time.perf_counter()
+    results: dict[str, dict[str, Any]] = {}
+    # 変換は CPU を使うので、スレッドではなくエクスポートごとのプロセスで並行させる
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(exports)))) as file_executor:
+        futures = {file_executor.submit(convert_batch_export, path, args): path for path in exports}
+        for future in as_completed(futures):
+            try:
+                summary, log = future.result()
+            except Exception as e:  # プロセスが異常終了した場合など
+                print(t("error_occurred", f"{futures[future]}: {e}"))
+                continue
+            print(log, end="", flush=True)
+            if summary is not None:
+                results[futures[future]] = summary
+
+    summaries = [results[path] for path in exports if path in results]
+    print_batch_summary(summaries, time.perf_counter() - started)
+    return summaries
+
+
+def is_export_name(name: str) -> bool:
+    return name.lower().endswith(EXPORT_SUFFIXES)
+
+
+def watch_inbox(directory: str, args: argparse.Namespace) -> list[dict[str, Any]]:
+    """
+    Convert every export saved into directory, incrementally into --output_file (the same
+    last_entry_time.txt and shards as a single run), until interrupted. The exports already there
+    are converted first, oldest first. The process stays warm between files: modules, the message
+    catalog, the worker pool and the conversion cache connection are set up only once.
+    Every export is read as with --incremental: reading stops at the first entry not newer than the
+    checkpoint (the newest entry written so far), so an overlapping export only reads its new entries.
+    Returns the summaries of the exports converted.
+    """
+    if not os.path.isdir(directory):
+        print(t("file_not_found", directory))
+        return []
+    # --seen-index ではインデックスで判定するため、convert_file は日時での打ち切りを行わない
+    args = argparse.Namespace(**{**vars(args), "incremental": True})
+
+    executor = None
+    if args.workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+    # 監視を始めてから既存のファイルを調べる (その間に届いたファイルを取りこぼさない)
+    watcher = open_watcher(directory, is_export_name, args.watch_interval)
+    print(t("watch_started", directory, watcher.method))
+
+    existing = scan_inbox(directory, is_export_name)
+    pending = sorted(existing, key=lambda path: existing[path][1])
+    converted: dict[str, tuple[int, int]] = {}  # 変換したファイル -> その時の (大きさ, 更新時刻)
+    summaries: list[dict[str, Any]] = []
+    try:
+        while True:
+            for input_xml_filename in pending:
+                signature = file_signature(input_xml_filename)
+                if signature is None or converted.get(input_xml_filename) == signature:
+                    continue
+                converted[input_xml_filename] = signature
+                try:
+                    summary = convert_file(input_xml_filename, args.output_file, args, executor=executor, profile=new_profile(args))
+                except Exception as e:
+                    print(t("error_occurred", f"{input_xml_filename}: {e}"))
+                    continue
+                summaries.append(summary)
+                print(t("watch_converted", input_xml_filename, summary["written"], summary["seconds"]))
+            pending = watcher.wait()
+    except KeyboardInterrupt:
+        print(t("watch_stopped", len(summaries)))
+    finally:
+        watcher.close()
+        if executor is not None:
+            executor.shutdown()
+    return summaries
+
+
+def print_cache_stats(cache_path: str, html_engine: str, before: dict[str, int]) -> None:
+    """Print the cache counters accumulated since `before` (worker processes included)"""
+    cache = open_cache(cache_path, namespace=cache_namespace(html_engine))
+    stats = {name: value - before.get(name, 0) for name, value in cache.read_stats().items()}
+    print(t("cache_stats", stats["hits"], stats["misses"], stats["evictions"]))
+
+
+def repair_manifests(args: argparse.Namespace) -> None:
+    """Rebuild the shard manifests from the files on disk"""
+    if args.batch:
+        targets = [batch_output_filename(path, args.output_file) for path in find_exports(args.batch)]
+    else:
+        targets = [args.output_file]
+    for output_md_filename in targets:
+        base_name, ext = os.path.splitext(output_md_filename)
+        shards = rebuild_manifest(base_name, ext)
+        rebuild_entry_index(base_name, shards)
+        print(t("manifest_rebuilt", manifest_filename(base_name), len(shards), sum(shard["entries"] for shard in shards)))
+
+
+def lookup_entries(output_md_filename: str, query: str) -> int:
+    """Print the entries matching query, found in the index and read with one seek each (writes nothing); returns the count"""
+    base_name, ext = os.path.splitext(output_md_filename)
+    found = 0
+    for record in load_entry_index(base_name, ext, repair=False):
+        if query in record["date"] or query in record["title"] or query == record["hash"]:
+            print(t("lookup_location", record["file"], record["offset"], record["length"], record["hash"]))
+            print(read_entry(base_name, record), end="")
+            found += 1
+    if not found:
+        print(t("lookup_not_found", query))
+    return found
+
+
+def rebuild_changed_entries(input_xml_filename: str, output_md_filename: str, args: argparse.Namespace) -> int:
+    """
+    Convert every entry of the export again (the checkpoint is neither used nor moved) and replace the
+    entries whose Markdown differs from the indexed one, matched by date and title. Only the shards
+    holding a changed entry are rewritten; the others are not touched. Returns the number of shards rewritten.
+    """
+    base_name, ext = os.path.splitext(output_md_filename)
+    records = load_entry_index(base_name, ext)
+    # (日時, タイトル) -> 同じ見出しのエントリの記録 (ファイルの順)
+    by_heading: dict[tuple[str, str], deque[dict[str, Any]]] = {}
+    for record in records:
+        by_heading.setdefault((record["date"], record["title"]), deque()).append(record)
+
+    replacements: dict[str, dict[int, bytes]] = {}  # ファイル -> 位置 -> 新しい内容
+    changed = unmatched = 0
+    entries = (extract_entry_fields(element) for element in iter_items(input_xml_filename, mmap_threshold=args.mmap_threshold))
+    for _, text in iter_converted_entries(
+        entries,
+        datetime.min.replace(tzinfo=timezone.utc),
+        args.html_engine,
+        args.workers,
+        args.batch_size,
+        args.cache,
+        args.cache_size,
+    ):
+        data = text.encode("utf-8")
+        new_record = entry_record("", 0, data)
+        candidates = by_heading.get((new_record["date"], new_record["title"]))
+        if not candidates:
+            unmatched += 1  # 出力にないエントリ (通常の変換で追加される)
+            continue
+        record = candidates.popleft()
+        if record["hash"] != new_record["hash"]:
+            replacements.setdefault(record["file"], {})[record["offset"]] = data
+            changed += 1
+
+    shards = load_manifest(base_name) or []
+    records_by_file: dict[str, list[dict[str, Any]]] = {}
+    for record in records:
+        records_by_file.setdefault(record["file"], []).append(record)
+    for shard in shards:
+        if shard["file"] in replacements:
+            records_by_file[shard["file"]] = rewrite_entries(
+                base_name, shard, records_by_file[shard["file"]], replacements[shard["file"]]
+            )
+            print(t("shard_rewritten", shard["file"], len(replacements[shard["file"]])))
+            if shard["bytes"] > args.limit:
+                print(t("shard_over_limit", shard["file"], shard["bytes"], args.limit))
+            # ファイルごとに記録し直す (中断してもインデックスとマニフェストはディスクの内容と一致する)
+            save_entry_index(base_name, [record for indexed in shards for record in records_by_file.get(indexed["file"], [])])
+            save_manifest(base_name, shards)
+    print(t("rebuild_changed_summary", changed, len(replacements), len(shards), unmatched))
+    return len(replacements)
+
+
+def main() -> None:
+    args = build_arg_parser().parse_args()
+    if args.lang:
+        set_language(args.lang)
+
+    if args.repair_manifest:
+        repair_manifests(args)
+        return
+    if args.lookup is not None:
+        lookup_entries(args.output_file, args.lookup)
+        return
+
+    cache_stats_before: dict[str, int] = {}
+    if args.cache:
+        cache_stats_before = open_cache(args.cache, args.cache_size, cache_namespace(args.html_engine)).read_stats()
+
+    summaries: list[dict[str, Any]] = []
+    if args.watch:
+        summaries = watch_inbox(args.watch, args)
+    elif args.batch:
+        summaries = convert_batch(args.batch, args)
+    else:
+        input_xml_filename = args.input or select_xml_file()
+        if not input_xml_filename:
+            print("XMLファイルが選択されませんでした。処理を中断します。")
+            return
+
+        try:
+            if args.rebuild_changed:
+                rebuild_changed_entries(input_xml_filename, args.output_file, args)
+                return
+            summaries.append(convert_file(input_xml_filename, args.output_file, args, profile=new_profile(args)))
+        except Exception as e:
+            print(t("error_occurred", e))
+            return
 
-        print(t("processing_complete", last_entry_time_loaded, last_entry_time_processed, total_files_written))
-    except Exception as e:
-        print(t("error_occurred", e))
+    if args.cache:
+        print_cache_stats(args.cache, args.html_engine, cache_stats_before)
+    if args.profile:
+        write_profile_report(args.profile, [summary["profile"] for summary in summaries])
+        print(t("profile_written", args.profile))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+"""
+--chronological で使う、メモリ使用量に上限のある外部ソート。
+
+要素を buffer_bytes まで溜めては並べ替えて一時ファイル (ラン) に書き出し、最後に全てのランを
+heapq.merge で k-way マージします。同じキーの要素は入力の順に並びます (安定ソート)。
+全体が buffer_bytes に収まる場合は一時ファイルを作らず、メモリ上で並べ替えるだけです。
+"""
+import glob
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Optional, TypeVar
+
+SORT_BUFFER_BYTES = 64 << 20
+_RUN_BUFFER_SIZE = 1 << 18
+_RUN_DIRECTORY_PREFIX = "note-md-sort-"
+
+T = TypeVar("T")
+
+
+def _write_run(records: list[tuple[Any, int, Any]], path: str) -> None:
+    with open(path, "wb", buffering=_RUN_BUFFER_SIZE) as f:
+        for record in records:
+            pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(f: BinaryIO) -> Iterator[tuple[Any, int, Any]]:
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+def remove_stale_runs(directory: str) -> None:
+    """Remove the run directories left in directory by a sort that was killed"""
+    for path in glob.glob(os.path.join(glob.escape(directory), _RUN_DIRECTORY_PREFIX + "*")):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def external_sort(
+    items: Iterable[T],
+    key: Callable[[T], Any],
+    size: Callable[[T], int],
+    buffer_bytes: int = SORT_BUFFER_BYTES,
+    directory: Optional[str] = None,
+    on_spill: Optional[Callable[[int], None]] = None,
+) -> Iterator[T]:
+    """
+    Yield items ordered by key (stable), holding at most about buffer_bytes of them (as measured by
+    size) in memory. Sorted runs are spilled to a temporary directory inside directory (the system
+    default if None), which is removed when the generator finishes or is closed.
+    on_spill is called with the number of items of every run written to disk.
+    """
+    run_directory: Optional[str] = None
+    run_files: list[BinaryIO] = []
+    try:
+        buffer: list[tuple[Any, int, T]] = []
+        buffered = 0
+        run_count = 0
+        for sequence, item in enumerate(items):
+            # 入力の順番を2番目のキーにして、同じキーの要素の順序を保つ (要素自体は比較されない)
+            buffer.append((key(item), sequence, item))
+            buffered += size(item)
+            if buffered >= buffer_bytes:
+                if run_directory is None:
+                    run_directory = tempfile.mkdtemp(prefix=_RUN_DIRECTORY_PREFIX, dir=directory)
+                buffer.sort()
+                _write_run(buffer, os.path.join(run_directory, f"run-{run_count:05d}"))
+                run_count += 1
+                if on_spill is not None:
+                    on_spill(len(buffer))
+                buffer = []
+                buffered = 0
+        buffer.sort()
+        if run_directory is None:
+            for _, _, item in buffer:
+                yield item
+            return
+
+        runs: list[Iterable[tuple[Any, int, T]]] = [buffer]
+        for index in range(run_count):
+            f = open(os.path.join(run_directory, f"run-{index:05d}"), "rb", buffering=_RUN_BUFFER_SIZE)
+            run_files.append(f)
+            runs.append(_read_run(f))
+        for _, _, item in heapq.merge(*runs):
+            yield item
+    finally:
+        for f in run_files:
+            f.close()
+        if run_directory is not None:
+            shutil.rmtree(run_directory, ignore_errors=True)
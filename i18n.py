@@ -0,0 +1,128 @@
+"""
+xml_to_markdown_converter / split_markdown_file / convert_history で共有するメッセージカタログ。
+
+言語は最初に必要になったときに1度だけ判定し、その言語のカタログ (locales/<言語>.json) だけを読み込みます。
+set_language() または環境変数 NOTE_MD_LANG で言語を上書きできます。
+"""
+import functools
+import json
+import locale
+import os
+from typing import Any, Optional
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+LANGUAGE_ENV_VAR = "NOTE_MD_LANG"
+FALLBACK_LANGUAGE = "en"
+
+# TRANSLATIONSに含まれる言語名からISO 639-1コードへのマッピング辞書
+LANG_MAP = {
+    "Arabic": "ar",
+    "Bengali": "bn",
+    "German": "de",
+    "English": "en",
+    "Spanish": "es",
+    "Persian": "fa",
+    "French": "fr",
+    "Hindi": "hi",
+    "Indonesian": "id",
+    "Japanese": "ja",
+    "Javanese": "jv",
+    "Korean": "ko",
+    "Marathi": "mr",
+    "Malay": "ms",
+    "Punjabi": "pa",
+    "Portuguese": "pt",
+    "Russian": "ru",
+    "Swahili": "sw",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Thai": "th",
+    "Turkish": "tr",
+    "Ukrainian": "uk",
+    "Urdu": "ur",
+    "Vietnamese": "vi",
+    "Chinese_China": "zh_CN",
+    "Chinese_Taiwan": "zh_TW",
+}
+
+SUPPORTED_LANGUAGES = frozenset(LANG_MAP.values())
+
+_language_override: Optional[str] = None
+_catalogs: dict[str, dict[str, str]] = {}
+
+
+def _normalize_language(lang_code: str) -> Optional[str]:
+    """Map a language name or code to a supported catalog name"""
+    if lang_code in SUPPORTED_LANGUAGES:
+        return lang_code
+    lang_code = LANG_MAP.get(lang_code, lang_code)
+    if lang_code in ("zh_CN", "zh-Hans", "zh-CN"):
+        return "zh_CN"
+    if lang_code in ("zh_TW", "zh-Hant", "zh-TW"):
+        return "zh_TW"
+    lang_code = lang_code.split("_")[0].split("-")[0].lower()
+    return lang_code if lang_code in SUPPORTED_LANGUAGES else None
+
+
+@functools.lru_cache(maxsize=None)
+def _detect_system_language() -> str:
+    """detect OS language setting (once per process)"""
+    env_language = os.environ.get(LANGUAGE_ENV_VAR)
+    if env_language:
+        return _normalize_language(env_language) or FALLBACK_LANGUAGE
+
+    try:
+        lang_tuple = locale.getlocale()
+        if not lang_tuple[0]:
+            return FALLBACK_LANGUAGE
+
+        lang_name = lang_tuple[0].split("_")[0]
+        if lang_name in ("zh", "Chinese"):
+            # 中国語は地域で判定する ("zh_CN" や、Windows の "Chinese_China" / "Chinese_Taiwan")
+            return _normalize_language(lang_tuple[0].split(".")[0]) or FALLBACK_LANGUAGE
+        lang_code = LANG_MAP.get(lang_name, lang_name[:2].lower())
+        return _normalize_language(lang_code) or FALLBACK_LANGUAGE
+
+    except Exception as e:
+        error_msg = _catalog(FALLBACK_LANGUAGE).get("error_lang_detection", "Error: {}")
+        print(error_msg.format(e))
+        return FALLBACK_LANGUAGE
+
+
+def get_system_language() -> str:
+    """Return the active message language (the override if set, otherwise the detected one)"""
+    return _language_override or _detect_system_language()
+
+
+def set_language(lang: Optional[str]) -> None:
+    """Override the message language for this process (None restores detection)"""
+    global _language_override
+    _language_override = _normalize_language(lang) if lang else None
+
+
+def _catalog(lang: str) -> dict[str, str]:
+    """Load one language's messages on first use"""
+    catalog = _catalogs.get(lang)
+    if catalog is None:
+        try:
+            with open(os.path.join(LOCALES_DIR, f"{lang}.json"), encoding="utf-8") as f:
+                catalog = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            catalog = {}
+        _catalogs[lang] = catalog
+    return catalog
+
+
+def t(key: str, *args: Any) -> str:
+    """Translation function"""
+    msg = _catalog(get_system_language()).get(key)
+    if msg is None:
+        msg = _catalog(FALLBACK_LANGUAGE).get(key, key)
+
+    if args:
+        try:
+            return msg.format(*args)
+        except IndexError:
+            # Safety measure in case the number of placeholders and variables do not match
+            return msg
+    return msg
@@ -0,0 +1,140 @@
+"""
+--pipeline で使う、スレッドで動く処理段階と段階の間の上限付きキュー。
+
+各段階はジェネレーターをそのまま別スレッドで回し、結果を chunk_size 件ずつキューに入れます。
+キューが一杯になると上流の段階は待つ (背圧) ため、メモリ使用量は段階の数 × depth × chunk_size 件で頭打ちになります。
+キューの出し入れで待った時間を記録し、段階ごとの稼働率 (待っていなかった時間の割合) を求めます。
+"""
+import queue
+import threading
+import time
+from typing import Any, Generic, Iterable, Iterator, Optional, TypeVar
+
+# 段階の間のキューに入れておけるチャンクの数
+PIPELINE_QUEUE_DEPTH = 4
+
+T = TypeVar("T")
+
+_DONE = object()
+# 下流が止まったことに気付くまで、上流がキューへの追加を待つ最長時間
+_STOP_POLL_SECONDS = 0.1
+
+
+class ThreadedIterator(Generic[T]):
+    """Iterate an iterable in a background thread, handing items to the consumer through a bounded queue"""
+
+    def __init__(self, iterable: Iterable[T], name: str, chunk_size: int = 64, depth: int = PIPELINE_QUEUE_DEPTH):
+        self.name = name
+        self.chunk_size = max(1, chunk_size)
+        self.put_wait = 0.0  # 下流が追いつかずに待った時間 (このスレッド)
+        self.get_wait = 0.0  # 上流を待った時間 (消費する側のスレッド)
+        self.finished: Optional[float] = None
+        self._iterable = iterable
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._stopped = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=f"note-md-{name}", daemon=True)
+        self._thread.start()
+
+    def _put(self, chunk: Any) -> bool:
+        started = time.perf_counter()
+        try:
+            while True:
+                try:
+                    self._queue.put(chunk, timeout=_STOP_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    if self._stopped:
+                        return False
+        finally:
+            self.put_wait += time.perf_counter() - started
+
+    def _run(self) -> None:
+        iterator = iter(self._iterable)
+        chunk: list[T] = []
+        try:
+            for item in iterator:
+                if self._stopped:
+                    return
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    if not self._put(chunk):
+                        return
+                    chunk = []
+            if chunk:
+                self._put(chunk)
+        except BaseException as e:
+            self._error = e
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()  # 途中で止まった場合も、上流のジェネレーター (とそのスレッド) をこのスレッドで終わらせる
+            self.finished = time.perf_counter()
+            self._put(_DONE)
+
+    def __iter__(self) -> Iterator[T]:
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = self._queue.get()
+                self.get_wait += time.perf_counter() - started
+                if chunk is _DONE:
+                    break
+                yield from chunk
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        """Ask the producer to stop (it notices within _STOP_POLL_SECONDS)"""
+        self._stopped = True
+
+    def close(self) -> None:
+        """Stop the producer and wait for its thread"""
+        self.stop()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+class Pipeline:
+    """A chain of ThreadedIterator stages; the last one is consumed by the calling thread"""
+
+    def __init__(self, chunk_size: int = 64, depth: int = PIPELINE_QUEUE_DEPTH):
+        self.chunk_size = chunk_size
+        self.depth = depth
+        self.stages: list[ThreadedIterator] = []
+        self.started = time.perf_counter()
+
+    def stage(self, iterable: Iterable[T], name: str) -> ThreadedIterator[T]:
+        """Start iterating iterable in its own thread (iterable normally consumes the previous stage)"""
+        stage = ThreadedIterator(iterable, name, self.chunk_size, self.depth)
+        self.stages.append(stage)
+        return stage
+
+    def close(self) -> None:
+        """
+        Stop every stage and wait for their threads. Needed when a stage failed: the saved exception
+        keeps the upstream generators alive, so they would not be closed by garbage collection.
+        """
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.close()
+
+    def utilization(self, consumer: str) -> dict[str, float]:
+        """
+        Fraction of the elapsed time each stage spent working rather than waiting on its queues,
+        with the calling thread reported as `consumer`. The stage closest to 1.0 is the bottleneck.
+        """
+        now = time.perf_counter()
+        wall = max(now - self.started, 1e-9)
+        result = {}
+        upstream_wait = 0.0
+        for stage in self.stages:
+            active = (stage.finished or now) - self.started
+            result[stage.name] = max(0.0, active - stage.put_wait - upstream_wait) / wall
+            upstream_wait = stage.get_wait
+        result[consumer] = max(0.0, wall - upstream_wait) / wall
+        return result
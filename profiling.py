@@ -0,0 +1,156 @@
+"""
+変換1回分の計測 (段階ごとの経過時間・CPU 時間、件数、入出力バイト数、変換に時間のかかったエントリ)。
+
+段階は入れ子になったジェネレーターとして動くため、各段階の時間はその段階自身の処理だけを数えます
+(内側の段階を待っていた時間は差し引きます)。--profile を指定しない場合は NullProfile を使い、
+ジェネレーターを包まずにそのまま返すので計測のコストはかかりません。
+"""
+import contextlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from typing import Any, ContextManager, Iterable, Iterator
+
+PROFILE_REPORT_VERSION = 1
+DEFAULT_SLOWEST_ENTRIES = 10
+
+
+class Profile:
+    """Per-stage wall/CPU time (exclusive of nested stages), counters and the slowest entries of one run"""
+
+    enabled = True
+
+    def __init__(self, slowest: int = DEFAULT_SLOWEST_ENTRIES):
+        self.stages: dict[str, list[float]] = {}  # 段階 -> [経過時間, CPU 時間, 呼び出し回数]
+        self.counters: dict[str, int] = {}
+        self.slowest = slowest
+        self._slowest_heap: list[tuple[float, int, str, str]] = []
+        self._sequence = itertools.count()
+        # スレッドごとの実行中の段階: [開始時刻, 開始時の CPU 時間, 内側の段階の経過時間, 内側の段階の CPU 時間]
+        # (--pipeline では段階が別々のスレッドで動く)
+        self._local = threading.local()
+        self._started = time.perf_counter()
+        self._cpu_started = time.thread_time()
+
+    def _stack(self) -> list[list[float]]:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def _enter(self) -> None:
+        self._stack().append([time.perf_counter(), time.thread_time(), 0.0, 0.0])
+
+    def _exit(self, name: str) -> None:
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        stack = self._stack()
+        started, cpu_started, child_wall, child_cpu = stack.pop()
+        wall -= started
+        cpu -= cpu_started
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = [0.0, 0.0, 0]
+        stage[0] += wall - child_wall
+        stage[1] += cpu - child_cpu
+        stage[2] += 1
+        if stack:
+            parent = stack[-1]
+            parent[2] += wall
+            parent[3] += cpu
+
+    @contextlib.contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit(name)
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Time a block as stage `name`"""
+        return self._stage(name)
+
+    def timed(self, iterable: Iterable[Any], name: str) -> Iterator[Any]:
+        """Yield from iterable, counting the time spent producing each item as stage `name`"""
+        iterator = iter(iterable)
+        while True:
+            self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit(name)
+            yield item
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def entry(self, seconds: float, pub_date: str, title: str) -> None:
+        """Record the conversion time of one entry (only the slowest ones are kept)"""
+        item = (seconds, next(self._sequence), pub_date, title)
+        if len(self._slowest_heap) < self.slowest:
+            heapq.heappush(self._slowest_heap, item)
+        elif seconds > self._slowest_heap[0][0]:
+            heapq.heapreplace(self._slowest_heap, item)
+
+    def report(self, **details: Any) -> dict[str, Any]:
+        """Return the measurements as a JSON-serializable dict (details are added as they are)"""
+        wall = time.perf_counter() - self._started
+        cpu = time.thread_time() - self._cpu_started
+        stages = {
+            name: {"wall_seconds": stage_wall, "cpu_seconds": stage_cpu, "calls": calls}
+            for name, (stage_wall, stage_cpu, calls) in self.stages.items()
+        }
+        # どの段階にも含まれない時間 (チェックポイントの読み書きなど)
+        stages["other"] = {
+            "wall_seconds": max(0.0, wall - sum(stage[0] for stage in self.stages.values())),
+            "cpu_seconds": max(0.0, cpu - sum(stage[1] for stage in self.stages.values())),
+            "calls": 1,
+        }
+        return {
+            **details,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "stages": stages,
+            "counters": dict(self.counters),
+            "slowest_entries": [
+                {"seconds": seconds, "pubDate": pub_date, "title": title}
+                for seconds, _, pub_date, title in sorted(self._slowest_heap, reverse=True)
+            ],
+        }
+
+
+class NullProfile(Profile):
+    """Profile that records nothing: used when --profile is off so the pipeline is not wrapped"""
+
+    enabled = False
+
+    def __init__(self) -> None:
+        super().__init__(slowest=0)
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return contextlib.nullcontext()
+
+    def timed(self, iterable: Iterable[Any], name: str) -> Iterable[Any]:  # type: ignore[override]
+        return iterable
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def entry(self, seconds: float, pub_date: str, title: str) -> None:
+        pass
+
+
+NULL_PROFILE = NullProfile()
+
+
+def write_profile_report(path: str, reports: list[dict[str, Any]]) -> None:
+    """Save the reports of one invocation (one per converted export) as JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": PROFILE_REPORT_VERSION, "exports": reports}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
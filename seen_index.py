@@ -0,0 +1,71 @@
+"""
+--seen-index で使う、書き込み済みエントリの永続インデックス。
+
+各エントリを guid (なければ link、それもなければ pubDate) と、タイトル・本文のハッシュから作った
+16 バイトのダイジェストで識別します。ファイルは先頭の識別子の後にダイジェストを並べただけのもので、
+実行が完了するたびに新しいものを末尾に追記します。読み込み時に全てを set に入れるため、
+判定はエントリ数に関係なく O(1) です (ダイジェスト1件あたりディスク上で 16 バイト)。
+本文が編集されたエントリは別のダイジェストになるので、新しい版として書き込まれます。
+"""
+import hashlib
+import os
+from typing import Iterable
+
+SEEN_INDEX_FILE = "seen_index.bin"
+SEEN_INDEX_MAGIC = b"NOTESEEN\x01"
+DIGEST_SIZE = 16
+
+
+def entry_key(identity: str, title: str, html_content: str) -> bytes:
+    """Digest identifying one version of an entry: its guid/link plus a hash of its title and content"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in (identity, title, html_content):
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class SeenIndex:
+    """On-disk set of entry digests, loaded into memory as a whole"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.keys: set[bytes] = set()
+        self.size = 0  # 読み込んだ時点のファイルの大きさ (再開の判定に使う)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < len(SEEN_INDEX_MAGIC) and SEEN_INDEX_MAGIC.startswith(data):
+                data = SEEN_INDEX_MAGIC  # 識別子を書き終える前に中断された
+                os.truncate(path, 0)
+            elif not data.startswith(SEEN_INDEX_MAGIC):
+                raise ValueError(f"{path}: not a seen-entry index")
+            end = len(data) - (len(data) - len(SEEN_INDEX_MAGIC)) % DIGEST_SIZE
+            if end != len(data):
+                # 追記の途中で中断された場合の半端なダイジェストを切り捨てる (以降の追記がずれないように)
+                os.truncate(path, end)
+            self.keys = {data[offset:offset + DIGEST_SIZE] for offset in range(len(SEEN_INDEX_MAGIC), end, DIGEST_SIZE)}
+            self.size = os.path.getsize(path)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, keys: Iterable[bytes]) -> int:
+        """Append the digests not in the index yet to the file; returns how many were added"""
+        new_keys = []
+        for key in keys:
+            if key not in self.keys:
+                self.keys.add(key)
+                new_keys.append(key)
+        if new_keys:
+            with open(self.path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(SEEN_INDEX_MAGIC)
+                f.write(b"".join(new_keys))
+                f.flush()
+                os.fsync(f.fileno())
+            self.size = os.path.getsize(self.path)
+        return len(new_keys)
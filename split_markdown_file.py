@@ -1,525 +1,843 @@
 import os
+import array
 import contextlib
+import hashlib
+import json
+import re
+import shutil
+import sys
+import zlib
 from datetime import datetime, timezone
-from typing import Any
-import locale
-import json # TRANSLATIONSの型ヒントのため
-
-# TRANSLATIONSに含まれる言語名からISO 639-1コードへのマッピング辞書
-LANG_MAP = {
-    "Arabic": "ar",
-    "Bengali": "bn",
-    "German": "de",
-    "English": "en",
-    "Spanish": "es",
-    "Persian": "fa",
-    "French": "fr",
-    "Hindi": "hi",
-    "Indonesian": "id",
-    "Japanese": "ja",
-    "Javanese": "jv",
-    "Korean": "ko",
-    "Marathi": "mr",
-    "Malay": "ms",
-    "Punjabi": "pa",
-    "Portuguese": "pt",
-    "Russian": "ru",
-    "Swahili": "sw",
-    "Tamil": "ta",
-    "Telugu": "te",
-    "Thai": "th",
-    "Turkish": "tr",
-    "Ukrainian": "uk",
-    "Urdu": "ur",
-    "Vietnamese": "vi",
-    "Chinese_China": "zh_CN",
-    "Chinese_Taiwan": "zh_TW",
-}
-
-TRANSLATIONS = {
-    "ar": {
-        "error_lang_detection": "خطأ أثناء اكتشاف لغة النظام: {}",
-        "file_not_found": "خطأ: الملف غير موجود: {}",
-        "json_decode_error": "خطأ في فك ترميز JSON: {}",
-        "xml_parse_error": "خطأ في تحليل XML: {}",
-        "start_processing": "ðŸš€ بدء المعالجة: جاري تحميل {}...",
-        "extracted_entries": "تم استخراج {0} مدخلات، منها {1} هي سجل Gemini.",
-        "converting_markdown": "جاري التحويل إلى Markdown...",
-        "appended_to_file": "تمت إضافة سجلات الدردشة إلى الملف: {}",
-        "written_to_file": "تم كتابة سجلات الدردشة إلى الملف: {}",
-        "processing_complete": "âœ… اكتمل: تم حفظ السجل من {0} إلى {1} في إجمالي {2} ملفات.",
-        "error_occurred": "حدث خطأ: {}",
-    },
-    "bn": {
-        "error_lang_detection": "সিস্টেম ভাষা সনাক্তকরণে ত্রুটি: {}",
-        "file_not_found": "ত্রুটি: ফাইল পাওয়া যায়নি: {}",
-        "json_decode_error": "JSON ডিকোড ত্রুটি: {}",
-        "xml_parse_error": "XML পার্স ত্রুটি: {}",
-        "start_processing": "ðŸš€ প্রক্রিয়াকরণ শুরু হচ্ছে: {} লোড হচ্ছে...",     
-        "extracted_entries": "{0} এন্ট্রি বের করা হয়েছে, যার মধ্যে {1} টি Gemini ইতিহাস।",
-        "converting_markdown": "Markdown এ রূপান্তর করা হচ্ছে...",
-        "appended_to_file": "চ্যাট ইতিহাস ফাইলে যোগ করা হয়েছে: {}",
-        "written_to_file": "চ্যাট ইতিহাস ফাইলে লেখা হয়েছে: {}",
-        "processing_complete": "âœ… সম্পন্ন: {0} থেকে {1} পর্যন্ত ইতিহাস মোট {2} ফাইলে সংরক্ষণ করা হয়েছে।",
-        "error_occurred": "একটি ত্রুটি ঘটেছে: {}",
-    },
-    "de": {
-        "error_lang_detection": "Fehler bei der Erkennung der Systemsprache: {}",
-        "file_not_found": "Fehler: Datei nicht gefunden: {}",
-        "json_decode_error": "JSON-Decodierungsfehler: {}",
-        "xml_parse_error": "XML-Parse-Fehler: {}",
-        "start_processing": "ðŸš€ Verarbeitung gestartet: Lade {}...",
-        "extracted_entries": "{0} Einträge extrahiert, davon sind {1} Gemini-Verlauf.",
-        "converting_markdown": "Konvertiere zu Markdown...",
-        "appended_to_file": "Chatverläufe an Datei angehängt: {}",
-        "written_to_file": "Chatverläufe in Datei geschrieben: {}",
-        "processing_complete": "âœ… Abgeschlossen: Verlauf von {0} bis {1} in insgesamt {2} Dateien gespeichert.",
-        "error_occurred": "Ein Fehler ist aufgetreten: {}",
-    },
-    "en": {
-        "error_lang_detection": "Error while detecting system language: {}",
-        "file_not_found": "Error: File not found: {}",
-        "json_decode_error": "JSON decode error: {}",
-        "xml_parse_error": "XML parse error: {}",
-        "start_processing": "ðŸš€ Starting processing: Loading {}...",
-        "extracted_entries": "Extracted {0} entries, of which {1} are Gemini history.",
-        "converting_markdown": "Converting to Markdown...",
-        "appended_to_file": "Chat histories appended to file: {}",
-        "written_to_file": "Chat histories written to file: {}",
-        "processing_complete": "âœ… Completed: Saved history after {0} to {1} into a total of {2} files.",
-        "error_occurred": "An error occurred: {}",
-    },
-    "es": {
-        "error_lang_detection": "Error al detectar el idioma del sistema: {}",
-        "file_not_found": "Error: Archivo no encontrado: {}",
-        "json_decode_error": "Error al decodificar JSON: {}",
-        "xml_parse_error": "Error de análisis XML: {}",
-        "start_processing": "ðŸš€ Iniciando procesamiento: Cargando {}...",
-        "extracted_entries": "Se extrajeron {0} entradas, de las cuales {1} son historial de Gemini.",
-        "converting_markdown": "Convirtiendo a Markdown...",
-        "appended_to_file": "Historiales de chat agregados al archivo: {}",
-        "written_to_file": "Historiales de chat escritos en el archivo: {}",
-        "processing_complete": "âœ… Completado: Historial guardado desde {0} hasta {1} en un total de {2} archivos.",
-        "error_occurred": "Ocurrió un error: {}",
-    },
-    "fa": {
-        "error_lang_detection": "خطا در شناسایی زبان سیستم: {}",
-        "file_not_found": "خطا: فایل پیدا نشد: {}",
-        "json_decode_error": "خطای رمزگشایی JSON: {}",
-        "xml_parse_error": "خطای تجزیه XML: {}",
-        "start_processing": "ðŸš€ شروع پردازش: در حال بارگذاری {}...",
-        "extracted_entries": "{0} ورودی استخراج شد که {1} مورد از آنها تاریخچه Gemini است.",     
-        "converting_markdown": "در حال تبدیل به Markdown...",
-        "appended_to_file": "تاریخچه چت به فایل اضافه شد: {}",
-        "written_to_file": "تاریخچه چت در فایل نوشته شد: {}",
-        "processing_complete": "âœ… تکمیل شد: تاریخچه از {0} تا {1} در مجموع در {2} فایل ذخیره شد.",
-        "error_occurred": "یک خطا رخ داد: {}",
-    },
-    "fr": {
-        "error_lang_detection": "Erreur lors de la détection de la langue du système : {}",
-        "file_not_found": "Erreur : Fichier non trouvé : {}",
-        "json_decode_error": "Erreur de décodage JSON : {}",
-        "xml_parse_error": "Erreur d'analyse XML : {}",
-        "start_processing": "ðŸš€ Démarrage du traitement : Chargement de {}...",
-        "extracted_entries": "{0} entrées extraites, dont {1} sont l'historique Gemini.",
-        "converting_markdown": "Conversion en Markdown...",
-        "appended_to_file": "Historiques de chat ajoutés au fichier : {}",
-        "written_to_file": "Historiques de chat écrits dans le fichier : {}",
-        "processing_complete": "âœ… Terminé : Historique sauvegardé de {0} à {1} dans un total de {2} fichiers.",
-        "error_occurred": "Une erreur est survenue : {}",
-    },
-    "hi": {
-        "error_lang_detection": "त्रुटि: सिस्टम भाषा का पता लगाने में समस्या: {}",
-        "file_not_found": "त्रुटि: फ़ाइल नहीं मिली: {}",
-        "json_decode_error": "JSON डिकोड त्रुटि: {}",
-        "xml_parse_error": "XML पार्स त्रुटि: {}",
-        "start_processing": "ðŸš€ प्रसंस्करण शुरू हो रहा है: {} लोड हो रहा है...",
-        "extracted_entries": "Ditemukan {0} entri, di mana {1} adalah riwayat Gemini.",
-        "converting_markdown": "Mengonversi ke Markdown...",
-        "appended_to_file": "Riwayat obrolan ditambahkan ke file: {}",
-        "written_to_file": "Riwayat obrolan ditulis ke file: {}",
-        "processing_complete": "âœ… Selesai: Riwayat disimpan dari {0} hingga {1} dalam total {2} file.",
-        "error_occurred": "Terjadi kesalahan: {}",
-    },
-    "id": {
-        "error_lang_detection": "Error saat mendeteksi bahasa sistem: {}",
-        "file_not_found": "Error: File tidak ditemukan: {}",
-        "json_decode_error": "Error decode JSON: {}",
-        "xml_parse_error": "Error parse XML: {}",
-        "start_processing": "ðŸš€ Memulai pemrosesan: Memuat {}...",
-        "extracted_entries": "Estratti {0} voci, di cui {1} sono cronologia di Gemini.",
-        "converting_markdown": "Conversione in Markdown...",
-        "appended_to_file": "Cronologia chat aggiunta al file: {}",
-        "written_to_file": "Cronologia chat scritta nel file: {}",
-        "processing_complete": "âœ… Completato: Cronologia salvata da {0} a {1} in un totale di {2} file.",
-        "error_occurred": "Si è verificato un errore: {}",
-    },
-    "ja": {
-        "error_lang_detection": "システム言語の検出中にエラーが発生しました: {}",
-        "file_not_found": "エラー: ファイルが見つかりません: {}",
-        "json_decode_error": "JSONデコードエラー: {}",
-        "xml_parse_error": "XMLパースエラー: {}",
-        "start_processing": "ðŸš€ 処理開始: {} を読み込み中...",
-        "extracted_entries": "{0} 件抽出され、うち Gemini の履歴は {1} 件ありました。",
-        "converting_markdown": "Markdown に変換中...",
-        "appended_to_file": "チャット履歴をファイルに追記しました: {}",
-        "written_to_file": "チャット履歴をファイルに書き込みました: {}",
-        "processing_complete": "âœ… 完了しました: {0} より後の {1} までの履歴を延べ {2} ファイルに分割保存しました。", 
-        "error_occurred": "エラーが発生しました: {}",
-    },
-    "jv": {
-        "error_lang_detection": "Kesalahan saat mendeteksi bahasa sistem: {}",
-        "file_not_found": "Kesalahan: Berkas tidak ditemukan: {}",
-        "json_decode_error": "Kesalahan dekode JSON: {}",
-        "xml_parse_error": "Kesalahan parse XML: {}",
-        "start_processing": "ðŸš€ Memulai pemrosesan: Memuat {}...",
-        "extracted_entries": "Ditemukan {0} entri, di mana {1} adalah riwayat Gemini.",
-        "converting_markdown": "Mengonversi ke Markdown...",
-        "appended_to_file": "Riwayat obrolan ditambahkan ke berkas: {}",
-        "written_to_file": "Riwayat obrolan ditulis ke berkas: {}",
-        "processing_complete": "âœ… Selesai: Riwayat disimpan dari {0} hingga {1} dalam total {2} berkas.",
-        "error_occurred": "Terjadi kesalahan: {}",
-    },
-    "ko": {
-        "error_lang_detection": "시스템 언어 설정 감지 중 오류 발생: {}",
-        "file_not_found": "오류: 파일을 찾을 수 없습니다: {}",
-        "json_decode_error": "JSON 디코드 오류: {}",
-        "xml_parse_error": "XML 파스 오류: {}",
-        "start_processing": "ðŸš€ 처리 시작: {} 로드 중...",
-        "extracted_entries": "{0}개의 항목이 추출되었고, 그 중 {1}개는 Gemini 기록입니다.",
-        "converting_markdown": "Markdown으로 변환 중...",
-        "appended_to_file": "채팅 기록이 파일에 추가되었습니다: {}",
-        "written_to_file": "채팅 기록이 파일에 작성되었습니다: {}",
-        "processing_complete": "âœ… 완료: {0}부터 {1}까지의 기록이 총 {2}개의 파일에 저장되었습니다.",
-        "error_occurred": "오류가 발생했습니다: {}",
-    },
-    "mr": {
-        "error_lang_detection": "त्रुटी: सिस्टम भाषा ओळखण्यात समस्या: {}",       
-        "file_not_found": "त्रुटी: फाइल सापडली नाही: {}",
-        "json_decode_error": "JSON डिकोड त्रुटी: {}",
-        "xml_parse_error": "XML पार्स त्रुटी: {}",
-        "start_processing": "ðŸš€ प्रक्रिया सुरू होत आहे: {} लोड होत आहे...",
-        "extracted_entries": "{0} नोंदी काढल्या, ज्यापैकी {1} Gemini इतिहास आहे.",
-        "converting_markdown": "Markdown मध्ये रूपांतरित करत आहे...",
-        "appended_to_file": "चॅट इतिहास फाइलमध्ये जोडला गेला: {}",
-        "written_to_file": "चॅट इतिहास फाइलमध्ये लिहिला गेला: {}",
-        "processing_complete": "âœ… पूर्ण झाले: इतिहास {0} पासून {1} पर्यंत एकूण {2} फाइल्समध्ये जतन केला गेला.",
-        "error_occurred": "एक त्रुटी आली आहे: {}",
-    },
-    "ms": {
-        "error_lang_detection": "Ralat semasa mengesan bahasa sistem: {}",
-        "file_not_found": "Ralat: Fail tidak dijumpai: {}",
-        "json_decode_error": "Ralat nyahkod JSON: {}",
-        "xml_parse_error": "Ralat huraian XML: {}",
-        "start_processing": "ðŸš€ Memulakan pemprosesan: Memuat {}...",
-        "extracted_entries": "Diekstrak {0} entri, di mana {1} adalah sejarah Gemini.",
-        "converting_markdown": "Menukar kepada Markdown...",
-        "appended_to_file": "Sejarah sembang ditambah ke fail: {}",
-        "written_to_file": "Sejarah sembang ditulis ke fail: {}",
-        "processing_complete": "âœ… Selesai: Sejarah disimpan dari {0} hingga {1} dalam jumlah {2} fail.",
-        "error_occurred": "Ralat telah berlaku: {}",
-    },
-    "pa": {
-        "error_lang_detection": "ਸਿਸਟਮ ਭਾਸ਼ਾ ਦਾ ਪਤਾ ਲਗਾਉਣ ਸਮੇਂ ਤਰੁੱਟੀ: {}",
-        "file_not_found": "ਤਰੁੱਟੀ: ਫਾਈਲ ਨਹੀਂ ਮਿਲੀ: {}",
-        "json_decode_error": "JSON ਡੀਕੋਡ ਤਰੁੱਟੀ: {}",
-        "xml_parse_error": "XML ਪਾਰਸ ਤਰੁੱਟੀ: {}",
-        "start_processing": "ðŸš€ ਪ੍ਰਕਿਰਿਆ ਸ਼ੁਰੂ ਹੋ ਰਹੀ ਹੈ: {} ਲੋਡ ਹੋ ਰਿਹਾ ਹੈ...",
-        "extracted_entries": "{0} ਐਂਟਰੀਆਂ ਨਿਕਾਲੀਆਂ ਗਈਆਂ, ਜਿਨ੍ਹਾਂ ਵਿੱਚੋਂ {1} Gemini ਇਤਿਹਾਸ ਹੈ।",
-        "converting_markdown": "Markdown ਵਿੱਚ ਬਦਲ ਰਿਹਾ ਹੈ...",
-        "appended_to_file": "ਚੈਟ ਇਤਿਹਾਸ ਫਾਈਲ ਵਿੱਚ ਸ਼ਾਮਲ ਕੀਤਾ ਗਿਆ: {}",        
-        "written_to_file": "ਚੈਟ ਇਤਿਹਾਸ ਫਾਈਲ ਵਿੱਚ ਲਿਖਿਆ ਗਿਆ: {}",
-        "processing_complete": "âœ… ਮੁਕੰਮਲ: ਇਤਿਹਾਸ {0} ਤੋਂ {1} ਤੱਕ ਕੁੱਲ {2} ਫਾਈਲਾਂ ਵਿੱਚ ਸੁਰੱਖਿਅਤ ਕੀਤਾ ਗਿਆ।",
-        "error_occurred": "ਇੱਕ ਤਰੁੱਟੀ ਆਈ: {}",
-    },
-    "pt": {
-        "error_lang_detection": "Erro ao detectar o idioma do sistema: {}",
-        "file_not_found": "Erro: Arquivo não encontrado: {}",
-        "json_decode_error": "Erro de decodificação JSON: {}",
-        "xml_parse_error": "Erro de análise XML: {}",
-        "start_processing": "ðŸš€ Iniciando processamento: Carregando {}...",
-        "extracted_entries": "Extraídas {0} entradas, das quais {1} são histórico do Gemini.",
-        "converting_markdown": "Convertendo para Markdown...",
-        "appended_to_file": "Históricos de chat adicionados ao arquivo: {}",
-        "written_to_file": "Históricos de chat escritos no arquivo: {}",
-        "processing_complete": "âœ… Concluído: Histórico salvo de {0} a {1} em um total de {2} arquivos.",
-        "error_occurred": "Ocorreu um erro: {}",
-    },
-    "ru": {
-        "error_lang_detection": "Ошибка при определении языка системы: {}",
-        "file_not_found": "Ошибка: Файл не найден: {}",
-        "json_decode_error": "Ошибка декодирования JSON: {}",
-        "xml_parse_error": "Ошибка синтаксического анализа XML: {}",
-        "start_processing": "ðŸš€ Начало обработки: Загрузка {}...",
-        "extracted_entries": "Извлечено {0} записей, из которых {1} относятся к истории Gemini.",   
-        "converting_markdown": "Преобразование в Markdown...",
-        "appended_to_file": "История чата добавлена в файл: {}",
-        "written_to_file": "История чата записана в файл: {}",
-        "processing_complete": "âœ… Завершено: История сохранена с {0} по {1} в общей сложности в {2} файлах.",
-        "error_occurred": "Произошла ошибка: {}",
-    },
-    "sw": {
-        "error_lang_detection": "Hitilafu wakati wa kugundua lugha ya mfumo: {}",
-        "file_not_found": "Hitilafu: Faili haikupatikana: {}",
-        "json_decode_error": "Hitilafu ya kutafsiri JSON: {}",
-        "xml_parse_error": "Hitilafu ya kuchanganua XML: {}",
-        "start_processing": "ðŸš€ Kuanzia usindikaji: Inapakia {}...",
-        "extracted_entries": "Imechota rekodi {0}, ambapo {1} ni historia ya Gemini.",
-        "converting_markdown": "Inabadilisha kuwa Markdown...",
-        "appended_to_file": "Historia za mazungumzo zimeongezwa kwenye faili: {}",
-        "written_to_file": "Historia za mazungumzo zimeandikwa kwenye faili: {}",
-        "processing_complete": "âœ… Imekamilika: Historia imehifadhiwa kutoka {0} hadi {1} katika jumla ya faili {2}.",
-        "error_occurred": "Hitilafu imetokea: {}",
-    },
-    "ta": {
-        "error_lang_detection": "சிஸ்டம் மொழியை கண்டறிதலில் பிழை: {}",
-        "file_not_found": "பிழை: கோப்பு காணப்படவில்லை: {}",
-        "json_decode_error": "JSON குறியாக்கி பிழை: {}",
-        "xml_parse_error": "XML பாகுபடுத்தல் பிழை: {}",
-        "start_processing": "ðŸš€ செயலாக்கம் தொடங்குகிறது: {} ஏற்றப்படுகிறது...",
-        "extracted_entries": "à¸ดึงข้อมูล {0} รายการ ซึ่งมีประวัติของ Gemini จำนวน {1} รายการ",
-        "converting_markdown": "กำลังแปลงเป็น Markdown...",
-        "appended_to_file": "ประวัติการแชทถูกเพิ่มลงในไฟล์: {}",
-        "written_to_file": "ประวัติการแชทถูกเขียนลงในไฟล์: {}",
-        "processing_complete": "âœ… เสร็จสิ้น: บันทึกประวัติจาก {0} ถึง {1} ลงในไฟล์ทั้งหมด {2} ไฟล์",
-        "error_occurred": "เกิดข้อผิดพลาด: {}",
-    },
-    "te": {
-        "error_lang_detection": "సిస్టమ్ భాషను గుర్తించడంలో లోపం: {}",
-        "file_not_found": "లోపం: ఫైల్ కనుగొనబడలేదు: {}",
-        "json_decode_error": "JSON డీకోడ్ లోపం: {}",
-        "xml_parse_error": "XML పార్సింగ్ లోపం: {}",
-        "start_processing": "ðŸš€ ప్రాసెసింగ్ ప్రారంభం: {} లోడ్ అవుతోంది...",  
-        "extracted_entries": "{0} ఎంట్రీలు తీసుకోబడ్డాయి, వాటిలో {1} జెమిని చరిత్ర.",
-        "converting_markdown": "Markdown కు మారుస్తోంది...",
-        "appended_to_file": "చాట్ చరిత్ర ఫైల్‌కు జోడించబడింది: {}",
-        "written_to_file": "చాట్ చరిత్ర ఫైల్‌కు రాయబడింది: {}",
-        "processing_complete": "âœ… పూర్తయింది: చరిత్ర {0} నుండి {1} వరకు మొత్తం {2} ఫైళ్ళలో సేవ్ చేయబడింది.",
-        "error_occurred": "లోపం సంభవించింది: {}",
-    },
-    "th": {
-        "error_lang_detection": "เกิดข้อผิดพลาดขณะตรวจจับภาษาของระบบ: {}",  
-        "file_not_found": "ข้อผิดพลาด: ไม่พบไฟล์: {}",
-        "json_decode_error": "ข้อผิดพลาดในการถอดรหัส JSON: {}",
-        "xml_parse_error": "ข้อผิดพลาดในการแยกวิเคราะห์ XML: {}",
-        "start_processing": "ðŸš€ เริ่มการประมวลผล: กำลังโหลด {}...",
-        "extracted_entries": "ดึงข้อมูล {0} รายการ ซึ่งมีประวัติของ Gemini จำนวน {1} รายการ",
-        "converting_markdown": "กำลังแปลงเป็น Markdown...",
-        "appended_to_file": "ประวัติการแชทถูกเพิ่มลงในไฟล์: {}",
-        "written_to_file": "ประวัติการแชทถูกเขียนลงในไฟล์: {}",
-        "processing_complete": "âœ… เสร็จสิ้น: บันทึกประวัติจาก {0} ถึง {1} ลงในไฟล์ทั้งหมด {2} ไฟล์",
-        "error_occurred": "เกิดข้อผิดพลาด: {}",
-    },
-    "tr": {
-        "error_lang_detection": "Sistem dili algılanırken hata oluştu: {}",
-        "file_not_found": "Hata: Dosya bulunamadı: {}",
-        "json_decode_error": "JSON kod çözme hatası: {}",
-        "xml_parse_error": "XML ayrıştırma hatası: {}",
-        "start_processing": "ðŸš€ İşleme başlıyor: {} yükleniyor...",
-        "extracted_entries": "{0} giriş çıkarıldı, bunların {1} tanesi Gemini geçmişi.",
-        "converting_markdown": "Markdown'a dönüştürülüyor...",
-        "appended_to_file": "Sohbet geçmişi dosyaya eklendi: {}",
-        "written_to_file": "Sohbet geçmişi dosyaya yazıldı: {}",
-        "processing_complete": "âœ… Tamamlandı: {0} ile {1} arasındaki geçmiş toplam {2} dosyaya kaydedildi.",
-        "error_occurred": "Bir hata oluştu: {}",
-    },
-    "uk": {
-        "error_lang_detection": "Помилка під час визначення мови системи: {}",
-        "file_not_found": "Помилка: Файл не знайдено: {}",
-        "json_decode_error": "Помилка декодування JSON: {}",
-        "xml_parse_error": "Помилка синтаксичного аналізу XML: {}",
-        "start_processing": "ðŸš€ Початок обробки: Завантаження {}...",
-        "extracted_entries": "Вилучено {0} записів, з яких {1} стосуються історії Gemini.",
-        "converting_markdown": "Конвертація в Markdown...",
-        "appended_to_file": "Історія чату додана до файлу: {}",
-        "written_to_file": "Історія чату записана у файл: {}",
-        "processing_complete": "âœ… Завершено: Історія з {0} по {1} збережена усього в {2} файлах.",
-        "error_occurred": "Сталася помилка: {}",
-    },
-    "ur": {
-        "error_lang_detection": "سسٹم زبان کا پتہ لگانے میں خرابی: {}",
-        "file_not_found": "خرابی: فائل نہیں ملی: {}",
-        "json_decode_error": "JSON ڈی کوڈنگ کی خرابی: {}",
-        "xml_parse_error": "XML پارسنگ کی خرابی: {}",
-        "start_processing": "ðŸš€ پراسیسنگ شروع ہو رہی ہے: {} لوڈ ہو رہا ہے...",
-        "extracted_entries": "{0} اندراجات نکالے گئے، جن میں سے {1} Gemini کی تاریخ ہے",
-        "converting_markdown": "Markdown میں تبدیل کیا جا رہا ہے...",
-        "appended_to_file": "چیٹ کی تاریخ فائل میں شامل کر دی گئی ہے: {}",
-        "written_to_file": "چیٹ کی تاریخ فائل میں لکھ دی گئی ہے: {}",
-        "processing_complete": "âœ… مکمل ہو گیا: تاریخ {0} سے {1} تک کل {2} فائلوں میں محفوظ کر دی گئی ہے",
-        "error_occurred": "ایک خرابی پیش آئی: {}",
-    },
-    "vi": {
-        "error_lang_detection": "Lỗi khi phát hiện ngôn ngữ hệ thống: {}",
-        "file_not_found": "Lỗi: Không tìm thấy tệp: {}",
-        "json_decode_error": "Lỗi giải mã JSON: {}",
-        "xml_parse_error": "Lỗi phân tích XML: {}",
-        "start_processing": "ðŸš€ Bắt đầu xử lý: Đang tải {}...",
-        "extracted_entries": "Đã trích xuất {0} mục, trong đó có {1} là lịch sử Gemini.",
-        "converting_markdown": "Đang chuyển đổi sang Markdown...",
-        "appended_to_file": "Lịch sử trò chuyện đã được thêm vào tệp: {}",
-        "written_to_file": "Lịch sử trò chuyện đã được ghi vào tệp: {}",
-        "processing_complete": "âœ… Hoàn thành: Đã lưu lịch sử từ {0} đến {1} vào tổng cộng {2} tệp.",
-        "error_occurred": "Đã xảy ra lỗi: {}",
-    },
-    "zh_CN": {
-        "error_lang_detection": "检测系统语言时出错：{}",
-        "file_not_found": "错误：未找到文件：{}",
-        "json_decode_error": "JSON 解码错误：{}",
-        "xml_parse_error": "XML 解析错误：{}",
-        "start_processing": "ðŸš€ 开始处理：正在加载 {}...",
-        "extracted_entries": "提取了 {0} 条项目，其中 {1} 条是 Gemini 历史记录。",
-        "converting_markdown": "正在转换为 Markdown...",
-        "appended_to_file": "聊天历史已追加到文件：{}",
-        "written_to_file": "聊天历史已写入文件：{}",
-        "processing_complete": "âœ… 完成：已将 {0} 到 {1} 之间的历史记录保存到共计 {2} 个文件中。",
-        "error_occurred": "发生错误：{}",
-    },
-    "zh_TW": {
-        "error_lang_detection": "偵測系統語言時出錯：{}",
-        "file_not_found": "錯誤：未找到檔案：{}",
-        "json_decode_error": "JSON 解碼錯誤：{}",
-        "xml_parse_error": "XML 解析錯誤：{}",
-        "start_processing": "ðŸš€ 開始處理：正在載入 {}...",
-        "extracted_entries": "擷取了 {0} 條項目，其中 {1} 條是 Gemini 歷史記錄。",
-        "converting_markdown": "正在轉換為 Markdown...",
-        "appended_to_file": "聊天歷史已追加到檔案：{}",
-        "written_to_file": "聊天歷史已寫入檔案：{}",
-        "processing_complete": "âœ… 完成：已將 {0} 到 {1} 之間的歷史記錄儲存到共計 {2} 個檔案中。",
-        "error_occurred": "發生錯誤：{}",
-    },
-}
-
-def get_system_language() -> str:
-    """detect OS language setting"""
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Optional, Union
+
+from i18n import LANG_MAP, get_system_language, set_language, t
+
+LAST_ENTRY_TIME_FILE = "last_entry_time.txt"
+RESUME_JOURNAL_FILE = "resume_journal.jsonl"
+MANIFEST_VERSION = 1
+WRITE_BUFFER_SIZE = 1 << 18
+
+# before_commit(確定した先頭からの件数, それ以降で確定した番号, ファイルの記録)
+CommitCallback = Callable[[int, list[int], dict[str, Any]], None]
+
+# エントリの先頭行 (convert_entry が出力する "## YYYY/MM/DD HH:MM:SS")
+_ENTRY_HEADING_RE = re.compile(r"^## (.*)$")
+_TITLE_PREFIX = b"\n**Title**: "
+# _heading_keys: 見出しで始まらないエントリ、見出しの最初の行 (タイトルは前の行にまとめた後) より後
+_NOT_HEADING_RE = re.compile(rb"\0(?!## )[^\0]*")
+_HEADING_TAIL_RE = re.compile(rb"\n[^\0]*")
+_INDEX_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def temp_filename(output_filename: str) -> str:
+    return output_filename + ".tmp"
+
+
+def open_markdown_file(output_filename: str, header: bytes, is_append_mode: bool) -> BinaryIO:
+    """
+    Markdownファイルの一時ファイル (<ファイル名>.tmp) をバイナリで開いてヘッダーを書き込むヘルパー関数
+    (以降は UTF-8 のバイト列を書き込む)。追記モードでは既存の内容をコピーしてから追記します。
+    書き終えた一時ファイルは os.replace で元のファイルと置き換えるため、中断しても書きかけのファイルは残りません。
+    """
+    temp_path = temp_filename(output_filename)
+    if is_append_mode:
+        shutil.copyfile(output_filename, temp_path)
+    f = open(temp_path, "ab" if is_append_mode else "wb", buffering=WRITE_BUFFER_SIZE)
+    f.write(header)
+    return f
+
+
+def write_last_entry_time(last_processed_time: datetime, last_entry_time_file: str = LAST_ENTRY_TIME_FILE) -> None:
+    """Record the resume checkpoint (datetime.min means nothing was processed and is not written)"""
+    if last_processed_time != datetime.min.replace(tzinfo=timezone.utc):
+        with open(last_entry_time_file, "w", encoding="utf-8") as f:
+            f.write(last_processed_time.isoformat())
+
+
+def get_indexed_filename(output_basename: str, output_ext: str, idx: int) -> str:
+    return f"{output_basename}-{idx:02d}{output_ext}"
+
+
+def manifest_filename(output_basename: str) -> str:
+    """Path of the shard manifest kept next to the shards"""
+    return f"{output_basename}.manifest.jsonl"
+
+
+def load_manifest(output_basename: str) -> Optional[list[dict[str, Any]]]:
+    """
+    Return the shard records of the manifest, or None if it is missing or unreadable.
+    The manifest is a version line followed by one record per shard write (the last record of an index wins).
+    """
     try:
-        lang_tuple = locale.getlocale()
-        if lang_tuple[0]:
-            lang_name = lang_tuple[0].split("_")[0]
-            lang_code = LANG_MAP.get(lang_name, lang_name[:2].lower())
-        else:
-            lang_code = None
+        with open(manifest_filename(output_basename), encoding="utf-8") as f:
+            lines = f.readlines()
+        if json.loads(lines[0]).get("version") != MANIFEST_VERSION:
+            return None
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+    records: dict[int, dict[str, Any]] = {}
+    for line in lines[1:]:
+        with contextlib.suppress(ValueError, KeyError, TypeError):
+            record = json.loads(line)
+            records[record["index"]] = record
+    shards = [records[idx] for idx in sorted(records)]
+    # 中断で途切れた行や、同じファイルの古い記録が溜まった場合は書き直す
+    if not lines[-1].endswith("\n") or len(lines) > 2 * len(shards) + 1:
+        save_manifest(output_basename, shards)
+    return shards
+
+
+def save_manifest(output_basename: str, shards: list[dict[str, Any]]) -> None:
+    """Replace the manifest atomically so that an interrupted run never leaves half a file"""
+    path = manifest_filename(output_basename)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": MANIFEST_VERSION}) + "\n")
+        f.writelines(json.dumps(shard, ensure_ascii=False) + "\n" for shard in shards)
+    os.replace(temp_path, path)
+
+
+def append_manifest(output_basename: str, shard: dict[str, Any]) -> None:
+    """Record one shard write (appending keeps the cost per write independent of the number of shards)"""
+    with open(manifest_filename(output_basename), "a", encoding="utf-8") as f:
+        f.write(json.dumps(shard, ensure_ascii=False) + "\n")
+
+
+def entry_index_filename(output_basename: str) -> str:
+    """Path of the entry index (shard, byte offset, length, heading and hash of every entry) kept next to the shards"""
+    return f"{output_basename}.index.jsonl"
+
+
+def _heading(data: bytes) -> bytes:
+    """
+    The start of an entry up to the end of its **Title** line (or of the paragraph after its date line):
+    the part _heading_keys reads the date and title from. Only two searches, as it runs for every entry written.
+    """
+    return data[:data.find(b"\n\n", data.find(b"\n\n") + 2)]
+
+
+def _heading_keys(headings: list[bytes]) -> str:
+    """
+    Index keys of entry headings (_heading), one line each: "date<TAB>title", just the date without
+    a title, or an empty line for an entry without a heading. Converted for all of them at once.
+    """
+    # 1件ずつ処理せず、まとめて置き換える (XML の文字列には NUL を含められず、タイトルは最初の行だけを使う)
+    joined = b"\0" + b"\0".join(headings)
+    if joined.count(b"\0## ") != len(headings):
+        joined = _NOT_HEADING_RE.sub(b"\0## ", joined)  # 見出しのないエントリは空の見出しにする
+    joined = joined.replace(b"\n" + _TITLE_PREFIX, b"\t")
+    if b"\n" in joined:  # タイトルのないエントリ (日時の行の後の段落を除く)
+        joined = _HEADING_TAIL_RE.sub(b"", joined)
+    return joined.replace(b"\0## ", b"\n")[1:].decode("utf-8", "replace")
+
+
+def _hashes_hex(hashes: list[int]) -> str:
+    """CRC32 values as one hex string, 8 digits each"""
+    packed = array.array("I", hashes)
+    if sys.byteorder == "little":
+        packed.byteswap()
+    return packed.tobytes().hex()
+
+
+def entry_record(shard_file: str, offset: int, data: bytes) -> dict[str, Any]:
+    """
+    Entry record (file, offset, length, date, title, hash) of the encoded entry data at offset of shard_file.
+    date is the heading text and title the **Title** line of the entry, as written in the shard;
+    hash is the CRC32 of the data in hex.
+    """
+    return _index_record(shard_file, offset, len(data), _heading_keys([_heading(data)]), f"{zlib.crc32(data):08x}")
+
+
+def _index_record(shard_file: str, offset: int, length: int, key: str, crc: str) -> dict[str, Any]:
+    date, _, title = key.partition("\t")
+    return {"file": shard_file, "offset": offset, "length": length, "date": date, "title": title, "hash": crc}
+
+
+class _IndexRun:
+    """Entries written to a shard in one go: the offset of the first one, and the length, heading and CRC32 of each"""
+
+    __slots__ = ("start", "lengths", "headings", "hashes")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.lengths: list[int] = []
+        self.headings: list[bytes] = []
+        self.hashes: list[int] = []
+
+    def add(self, data: bytes) -> None:
+        self.lengths.append(len(data))
+        self.headings.append(_heading(data))
+        self.hashes.append(zlib.crc32(data))
+
+    def line(self, shard_file: str) -> str:
+        return _index_line(shard_file, self.start, self.lengths, _heading_keys(self.headings), _hashes_hex(self.hashes))
+
+
+def _index_line(shard_file: str, start: int, lengths: list[int], keys: str, hashes: str) -> str:
+    # キーとハッシュは全件で1つの文字列にする (JSON の要素が少ないほど速く書き込める)
+    return _INDEX_ENCODER.encode(
+        {"file": shard_file, "start": start, "lengths": lengths, "keys": keys, "hashes": hashes}
+    ) + "\n"
+
+
+def append_entry_index(output_basename: str, shard_file: str, run: _IndexRun) -> None:
+    """Record the entries of a committed shard write as one line"""
+    if not run.lengths:
+        return
+    with open(entry_index_filename(output_basename), "a", encoding="utf-8") as f:
+        if f.tell() == 0:
+            f.write(json.dumps({"version": MANIFEST_VERSION}) + "\n")
+        f.write(run.line(shard_file))
+
+
+def save_entry_index(output_basename: str, records: list[dict[str, Any]]) -> None:
+    """Replace the entry index atomically (one line per run of adjacent entries, normally one per shard)"""
+    lines = []
+    run: list[dict[str, Any]] = []
+    for record in records:
+        if run and (record["file"] != run[-1]["file"] or record["offset"] != run[-1]["offset"] + run[-1]["length"]):
+            lines.append(_records_line(run))
+            run = []
+        run.append(record)
+    if run:
+        lines.append(_records_line(run))
+    _save_index_lines(output_basename, lines)
+
+
+def _records_line(run: list[dict[str, Any]]) -> str:
+    return _index_line(
+        run[0]["file"],
+        run[0]["offset"],
+        [record["length"] for record in run],
+        "\n".join(f"{record['date']}\t{record['title']}" if record["title"] else record["date"] for record in run),
+        "".join(record["hash"] for record in run),
+    )
+
+
+def _save_index_lines(output_basename: str, lines: list[str]) -> None:
+    path = entry_index_filename(output_basename)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": MANIFEST_VERSION}) + "\n")
+        f.writelines(lines)
+    os.replace(temp_path, path)
+
+
+def _scan_entry_records(filename: str) -> list[dict[str, Any]]:
+    """
+    Build the entry index records of a shard on disk (entries are found as in _scan_shard).
+    Each entry ends after its last separator ("---" and a blank line), so a header written
+    when a later run appended to the shard is not counted as part of the entry before it.
+    """
+    with open(filename, "rb") as f:
+        content = f.read()
+    shard_file = os.path.basename(filename)
+    records: list[dict[str, Any]] = []
+    start: Optional[int] = None  # 読み込み中のエントリの先頭
+    end: Optional[int] = None  # そのエントリの区切り線 ("---" と空行) の終わり
+    at_entry_start = False
+    previous_line = b""
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        if at_entry_start and line.startswith(b"## "):
+            if start is not None:
+                records.append(entry_record(shard_file, start, content[start:end or offset]))
+            start, end = offset, None
+        offset += len(line)
+        if line == b"\n" and previous_line == b"---\n":
+            end = offset
+        if line.startswith(b"Generated at: ") or line == b"---\n":
+            at_entry_start = True
+        elif line != b"\n":
+            at_entry_start = False
+        previous_line = line
+    if start is not None:
+        records.append(entry_record(shard_file, start, content[start:end or offset]))
+    return records
+
+
+def rebuild_entry_index(output_basename: str, shards: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Rebuild the entry index from the shards on disk (repair command)"""
+    output_dir = os.path.dirname(output_basename)
+    records: list[dict[str, Any]] = []
+    for shard in shards:
+        records.extend(_scan_entry_records(os.path.join(output_dir, shard["file"])))
+    save_entry_index(output_basename, records)
+    return records
+
+
+def _records_cover_shard(records: list[dict[str, Any]], shard: dict[str, Any]) -> bool:
+    """Whether the index records of a shard match its manifest record (no overlaps, last entry ends the file)"""
+    if len(records) != shard["entries"]:
+        return False
+    position = 0
+    for record in records:
+        if record["offset"] < position:
+            return False
+        position = record["offset"] + record["length"]
+    return position == shard["bytes"] if records else True
+
+
+def load_entry_index(output_basename: str, output_ext: str, repair: bool = True) -> list[dict[str, Any]]:
+    """
+    Return the entry_record of every entry in shard order, from the index alone. Shards whose records
+    do not match the manifest (no index yet, an interrupted run or files edited by hand) are scanned
+    from disk; with repair=True the manifest and index are then saved again (repair=False never writes).
+    """
+    shards = load_manifest(output_basename)
+    if shards is None:
+        shards = rebuild_manifest(output_basename, output_ext) if repair else scan_manifest(output_basename, output_ext)
+
+    by_file: dict[str, dict[int, dict[str, Any]]] = {}
+    line_count = 0
+    with contextlib.suppress(OSError, ValueError, IndexError, AttributeError):
+        with open(entry_index_filename(output_basename), encoding="utf-8") as f:
+            lines = f.readlines()
+        if json.loads(lines[0]).get("version") == MANIFEST_VERSION:
+            line_count = len(lines) - 1
+            for line in lines[1:]:
+                with contextlib.suppress(ValueError, KeyError, TypeError):
+                    written = json.loads(line)
+                    shard_file, lengths, hashes = written["file"], written["lengths"], written["hashes"]
+                    keys = written["keys"].split("\n")
+                    if not len(lengths) == len(keys) == len(hashes) // 8:
+                        continue
+                    shard_records = by_file.setdefault(shard_file, {})
+                    offset = written["start"]
+                    for i, (length, key) in enumerate(zip(lengths, keys)):
+                        # 同じ位置は後の記録が有効
+                        shard_records[offset] = _index_record(shard_file, offset, length, key, hashes[i * 8:i * 8 + 8])
+                        offset += length
+
+    output_dir = os.path.dirname(output_basename)
+    records: list[dict[str, Any]] = []
+    rescanned = False
+    for shard in shards:
+        shard_records = sorted(by_file.get(shard["file"], {}).values(), key=lambda record: record["offset"])
+        if not _records_cover_shard(shard_records, shard):
+            shard_records = _scan_entry_records(os.path.join(output_dir, shard["file"]))
+            rescanned = True
+        records.extend(shard_records)
+    # 追記のたびに増えた行もまとめて、ファイルごとに1行に書き直す
+    if repair and (rescanned or line_count != sum(1 for shard in shards if shard["entries"])):
+        save_entry_index(output_basename, records)
+    return records
+
+
+def read_entry(output_basename: str, record: dict[str, Any]) -> str:
+    """Read one entry from its shard with a seek and a single read"""
+    with open(os.path.join(os.path.dirname(output_basename), record["file"]), "rb") as f:
+        f.seek(record["offset"])
+        return f.read(record["length"]).decode("utf-8")
+
+
+def rewrite_entries(
+    output_basename: str, shard: dict[str, Any], records: list[dict[str, Any]], replacements: dict[int, bytes]
+) -> list[dict[str, Any]]:
+    """
+    Rewrite one shard with the entries at the offsets in replacements replaced by new data, keeping
+    everything else byte for byte. Updates shard["bytes"] and returns the new records of its entries.
+    """
+    filename = os.path.join(os.path.dirname(output_basename), shard["file"])
+    with open(filename, "rb") as f:
+        content = f.read()
+    new_records = []
+    position = 0
+    with open(temp_filename(filename), "wb", buffering=WRITE_BUFFER_SIZE) as out:
+        for record in records:
+            out.write(content[position:record["offset"]])  # エントリの間のヘッダーなど
+            data = replacements.get(record["offset"])
+            if data is None:
+                data = content[record["offset"]:record["offset"] + record["length"]]
+            new_records.append(entry_record(shard["file"], out.tell(), data))
+            out.write(data)
+            position = record["offset"] + record["length"]
+        out.write(content[position:])
+        shard["bytes"] = out.tell()
+    os.replace(temp_filename(filename), filename)
+    return new_records
+
 
-        if lang_code is None:
-            return "en"
+def start_resume_journal(journal_file: str, identity: dict[str, Any]) -> None:
+    """Start a new resume journal for a run (identity: input file, start checkpoint, options)"""
+    with open(journal_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": MANIFEST_VERSION, **identity}, ensure_ascii=False) + "\n")
 
-        if lang_code == "zh_CN" or lang_code == "zh-Hans" or lang_name == "Chinese_China":
-            return "zh_CN"
-        elif lang_code == "zh_TW" or lang_code == "zh-Hant" or lang_name == "Chinese_Taiwan":
-            return "zh_TW"
 
-        lang_code = lang_code.split("_")[0].split("-")[0].lower()
-        if lang_code in TRANSLATIONS:
-            return lang_code
-        return "en"
+def append_resume_journal(journal_file: str, record: dict[str, Any]) -> None:
+    """Record a shard about to be committed: the shard record and how many input entries it covers"""
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_resume_journal(
+    journal_file: str, identity: Optional[dict[str, Any]], output_dir: str
+) -> Optional[dict[str, Any]]:
+    """
+    Return the last committed record of an interrupted run of the same input and options,
+    or None if there is nothing to resume. Records are written before the shard is replaced,
+    so a record counts as committed only if the shard on disk already has the recorded size.
+    Raises ValueError if an interrupted run of another input or other options (identity None:
+    an input that cannot be identified) already committed shards: appending would write them again.
+    """
+    try:
+        with open(journal_file, encoding="utf-8") as f:
+            lines = f.readlines()
+        header = json.loads(lines[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    committed: Optional[dict[str, Any]] = None
+    for line in reversed(lines[1:]):
+        with contextlib.suppress(ValueError, KeyError, TypeError, OSError):
+            record = json.loads(line)
+            if os.path.getsize(os.path.join(output_dir, record["shard"]["file"])) == record["shard"]["bytes"]:
+                committed = record
+                break
+    if identity is None or header != {"version": MANIFEST_VERSION, **identity}:
+        if committed is not None:
+            raise ValueError(t("resume_journal_mismatch", header.get("input", "?"), journal_file))
+        return None
+    return committed or {"consumed": 0, "last": None, "shard": None}
+
+
+def _scan_shard(filename: str) -> dict[str, Any]:
+    """
+    Count the entries of a shard on disk and read their first/last timestamps.
+    The headings only keep local wall-clock time, so rebuilt timestamps carry no UTC offset.
+    """
+    entries = 0
+    first: Optional[str] = None
+    last: Optional[str] = None
+    at_entry_start = False
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            if at_entry_start and (match := _ENTRY_HEADING_RE.match(line)):
+                entries += 1
+                with contextlib.suppress(ValueError):
+                    last = datetime.strptime(match.group(1), "%Y/%m/%d %H:%M:%S").isoformat()
+                    first = first or last
+            # エントリはヘッダー ("Generated at: ...") または区切り線 ("---") の後から始まる
+            if line.startswith("Generated at: ") or line == "---\n":
+                at_entry_start = True
+            elif line != "\n":
+                at_entry_start = False
+    return {"entries": entries, "first": first, "last": last}
+
+
+def rebuild_manifest(output_basename: str, output_ext: str) -> list[dict[str, Any]]:
+    """Rebuild the manifest from the shards on disk (repair command / first run without a manifest)"""
+    shards = scan_manifest(output_basename, output_ext)
+    save_manifest(output_basename, shards)
+    return shards
+
+
+def scan_manifest(output_basename: str, output_ext: str) -> list[dict[str, Any]]:
+    """The manifest records of the shards on disk (nothing is written)"""
+    shards: list[dict[str, Any]] = []
+    idx = 1
+    while os.path.exists(filename := get_indexed_filename(output_basename, output_ext, idx)):
+        shards.append({
+            "index": idx,
+            "file": os.path.basename(filename),
+            "bytes": os.path.getsize(filename),
+            **_scan_shard(filename),
+        })
+        idx += 1
+    return shards
+
+
+class _Rebuild:
+    """
+    State of a rebuild (split_and_save_markdown(rebuild=True)): shards are laid out again from the first
+    one, and a shard whose content is the same as the file on disk (apart from the Generated at line)
+    is not replaced, so the file and its mtime stay as they are.
+    """
+
+    def __init__(self, header_bytes: bytes):
+        self.header_size = len(header_bytes)
+        self.header_prefix = header_bytes[:header_bytes.index(b"Generated at: ") + len(b"Generated at: ")]
+        self.shards: list[dict[str, Any]] = []
+        self.index_lines: list[str] = []  # エントリのインデックスの行 (最後にまとめて書き直す)
+        self.kept = 0
+
+    def unchanged(self, output_filename: str, file_size: int, body_digest: bytes) -> bool:
+        """Whether the file on disk has file_size bytes and a body (after the header) with body_digest"""
+        with contextlib.suppress(OSError):
+            if os.path.getsize(output_filename) == file_size:
+                with open(output_filename, "rb") as f:
+                    content = f.read()
+                return (
+                    content.startswith(self.header_prefix)
+                    and content[self.header_size - 2:self.header_size] == b"\n\n"
+                    and hashlib.blake2b(content[self.header_size:]).digest() == body_digest
+                )
+        return False
+
+    def finish(self, output_basename: str, output_ext: str) -> int:
+        """Remove the shards after the last rebuilt one and save the manifest and entry index as a whole"""
+        removed = 0
+        idx = len(self.shards) + 1
+        while os.path.exists(filename := get_indexed_filename(output_basename, output_ext, idx)):
+            os.remove(filename)
+            print(t("shard_removed", filename))
+            removed += 1
+            idx += 1
+        save_manifest(output_basename, self.shards)
+        _save_index_lines(output_basename, self.index_lines)
+        return removed
+
+
+def _finish_shard(
+    out: BinaryIO,
+    output_basename: str,
+    output_filename: str,
+    is_append_mode: bool,
+    shard: dict[str, Any],
+    file_size: int,
+    entries: int,
+    first: Optional[datetime],
+    last: Optional[datetime],
+    committed_prefix: int,
+    committed_extra: list[int],
+    before_commit: Optional[CommitCallback],
+    index_run: _IndexRun,
+    rebuild: Optional[_Rebuild] = None,
+    body_digest: bytes = b"",
+) -> None:
+    """
+    書き終えた一時ファイルで元のファイルを置き換え、報告してエントリのインデックスとマニフェストに記録する
+    (rebuild では、内容が変わらないファイルは置き換えない)
+    """
+    out.close()
+    shard["bytes"] = file_size
+    shard["entries"] += entries
+    if first is not None and last is not None:
+        shard["first"] = shard["first"] or first.isoformat()
+        shard["last"] = last.isoformat()
+    if before_commit is not None:
+        before_commit(committed_prefix, committed_extra, shard)
+    if rebuild is not None and rebuild.unchanged(output_filename, file_size, body_digest):
+        os.remove(temp_filename(output_filename))
+        rebuild.kept += 1
+        print(t("shard_unchanged", output_filename))
+    else:
+        os.replace(temp_filename(output_filename), output_filename)
+        print(
+            t("appended_to_file", output_filename)
+            if is_append_mode
+            else t("written_to_file", output_filename)
+        )
+    append_entry_index(output_basename, shard["file"], index_run)
+    append_manifest(output_basename, shard)
+    if rebuild is not None:
+        rebuild.shards.append(shard)
+        if index_run.lengths:
+            rebuild.index_lines.append(index_run.line(shard["file"]))
 
-    except Exception as e:
-        error_msg = TRANSLATIONS.get("en", {}).get("error_lang_detection", "Error: {}")
-        print(error_msg.format(e))
-        return "en"
 
+def _save_packed(
+    markdown_texts: Iterable[Union[str, tuple[datetime, str]]],
+    output_basename: str,
+    get_shard_filename: Callable[[int], str],
+    file_size_limit: int,
+    pack_window: int,
+    header_bytes: bytes,
+    last_shard: Optional[tuple[dict[str, Any], int, bytes, bool]],
+    next_index: int,
+    before_commit: Optional[CommitCallback],
+    rebuild: Optional[_Rebuild] = None,
+) -> tuple[int, Optional[datetime]]:
+    """
+    Pack entries into as few shards as possible: every pack_window entries are placed largest first
+    into the first open shard they fit in (first-fit decreasing). All shards but the least filled one
+    are then written, the least filled one stays open for the next window. Inside a shard the entries
+    keep their feed order. last_shard = (record, size incl. header, header, continuing) of the shard to append to.
+    Returns (files written, newest datetime of the entries received) and prints the fill ratio
+    compared with the greedy split.
+    """
+    # ファイル: 記録 (未確定のファイルは None)、ヘッダー込みのサイズ、エントリ (番号, 日時, バイト列)
+    open_bins: list[dict[str, Any]] = []
+    if last_shard is not None:
+        record, size, header, _ = last_shard
+        open_bins.append({"shard": record, "size": size, "items": [], "append": True, "header": header})
 
-def t(key: str, *args: Any) -> str:
-    """Translation function"""
-    lang = get_system_language()
+    window: list[tuple[int, Optional[datetime], bytes]] = []
+    committed_prefix = 0
+    committed_above: set[int] = set()
+    files_written = 0
+    packed_bytes = 0
+    newest_item_time: Optional[datetime] = None
 
-    msg_map: dict[str, str] = TRANSLATIONS.get(lang, TRANSLATIONS["en"])
-    msg: str = msg_map.get(key, TRANSLATIONS["en"].get(key, key))
+    # 比較用に、先頭から順に詰めた場合 (通常の分割) のファイル数とサイズを数える
+    greedy_files = 0
+    greedy_bytes = 0
+    greedy_size = last_shard[1] if last_shard is not None else len(header_bytes)
+    greedy_items = 1 if last_shard is not None and last_shard[3] else 0
 
-    if args:
+    def commit(shard_bin: dict[str, Any]) -> None:
+        nonlocal next_index, committed_prefix, files_written, packed_bytes
+        if shard_bin["shard"] is None:
+            shard_bin["shard"] = {"index": next_index, "file": "", "bytes": 0, "entries": 0, "first": None, "last": None}
+            next_index += 1
+        output_filename = get_shard_filename(shard_bin["shard"]["index"])
+        shard_bin["shard"]["file"] = os.path.basename(output_filename)
+        items = sorted(shard_bin["items"])  # ファイルの中ではフィードの順に並べる
+        out = open_markdown_file(output_filename, shard_bin["header"], shard_bin["append"])
         try:
-            return msg.format(*args)
-        except IndexError:
-            # Safety measure in case the number of placeholders and variables do not match
-            return msg
-    return msg
+            out.writelines(data for _, _, data in items)
+        except BaseException:
+            out.close()
+            os.remove(out.name)
+            raise
+        for arrival, _, _ in items:
+            committed_above.add(arrival)
+        while committed_prefix in committed_above:
+            committed_above.remove(committed_prefix)
+            committed_prefix += 1
+        times = [item_time for _, item_time, _ in items if item_time is not None]
+        index_run = _IndexRun(shard_bin["size"] - sum(len(data) for _, _, data in items))
+        body_hash = hashlib.blake2b()
+        for _, _, data in items:
+            index_run.add(data)
+            if rebuild is not None:
+                body_hash.update(data)
+        _finish_shard(out, output_basename, output_filename, shard_bin["append"], shard_bin["shard"],
+                      shard_bin["size"], len(items), times[0] if times else None, times[-1] if times else None,
+                      committed_prefix, sorted(committed_above), before_commit,
+                      index_run, rebuild, body_hash.digest())
+        files_written += 1
+        packed_bytes += shard_bin["size"]
 
-LAST_ENTRY_TIME_FILE = "last_entry_time.txt"
+    def pack(final: bool) -> None:
+        nonlocal open_bins
+        for item in sorted(window, key=lambda item: len(item[2]), reverse=True):
+            size = len(item[2])
+            for shard_bin in open_bins:
+                if shard_bin["size"] + size <= file_size_limit:
+                    break
+            else:
+                shard_bin = {"shard": None, "size": len(header_bytes), "items": [], "append": False, "header": header_bytes}
+                open_bins.append(shard_bin)
+            shard_bin["items"].append(item)
+            shard_bin["size"] += size
+        window.clear()
 
+        carried = None if final or not open_bins else min(open_bins, key=lambda shard_bin: shard_bin["size"])
+        for shard_bin in open_bins:
+            if shard_bin is not carried and shard_bin["items"]:
+                commit(shard_bin)
+        open_bins = [carried] if carried is not None else []
+
+    for arrival, item in enumerate(markdown_texts):
+        if isinstance(item, tuple):
+            item_time, text = item
+            if item_time is not None and (newest_item_time is None or item_time > newest_item_time):
+                newest_item_time = item_time
+        else:
+            item_time, text = None, item
+        data = text.encode("utf-8")
+        window.append((arrival, item_time, data))
+
+        if greedy_size + len(data) > file_size_limit and greedy_items:
+            greedy_files += 1
+            greedy_bytes += greedy_size
+            greedy_size = len(header_bytes)
+            greedy_items = 0
+        greedy_size += len(data)
+        greedy_items += 1
+
+        if len(window) >= pack_window:
+            pack(final=False)
+    pack(final=True)
+
+    if greedy_items:
+        greedy_files += 1
+        greedy_bytes += greedy_size
+    if files_written:
+        print(t(
+            "pack_fill_ratio",
+            greedy_files,
+            100 * greedy_bytes / (greedy_files * file_size_limit),
+            files_written,
+            100 * packed_bytes / (files_written * file_size_limit),
+        ))
+    return files_written, newest_item_time
+
+
+def _finish_rebuild(rebuilding: _Rebuild, output_basename: str, output_ext: str, files_written: int) -> None:
+    if not rebuilding.shards:
+        # 入力を読めなかった場合などに、既存のファイルを全て削除しないようにする
+        print(t("rebuild_nothing_written"))
+        return
+    removed = rebuilding.finish(output_basename, output_ext)
+    print(t("rebuild_summary", files_written - rebuilding.kept, rebuilding.kept, removed))
 
-def write_markdown_file(output_filename: str, header: str, texts: list[str], is_append_mode: bool) -> None:
-    """Markdownコンテンツをファイルに書き込むヘルパー関数"""
-    mode = "a" if is_append_mode else "w"
-    with open(output_filename, mode, encoding="utf-8") as f:
-        f.write(header)
-        for text in texts:
-            f.write(text)
 
 def split_and_save_markdown(
-    markdown_texts: list[str],
+    markdown_texts: Iterable[Union[str, tuple[datetime, str]]],
     output_basename: str,
     output_ext: str,
     file_size_limit: int,
-    last_processed_time: datetime
+    last_processed_time: Optional[datetime] = None,
+    last_entry_time_file: str = LAST_ENTRY_TIME_FILE,
+    before_commit: Optional[CommitCallback] = None,
+    continue_last_shard: bool = False,
+    pack_window: int = 0,
+    rebuild: bool = False,
 ) -> int:
     """
-    Markdownテキストのリストを指定されたファイルサイズ制限に基づいて分割し、ファイルに保存します。
-    処理されたファイルの総数を返します。
+    Markdownテキスト (文字列、または (datetime, text) のタプル) を file_size_limit ごとのファイルに分割して保存し、
+    処理されたファイルの総数を返します。既存の出力があれば最後のファイルに追記し、各ファイルは一時ファイルから
+    置き換えるため、中断しても書きかけのファイルは残りません (マニフェストとエントリのインデックスも更新します)。
+    before_commit(確定した先頭からの件数, それ以降に確定した番号, ファイルの記録) は各ファイルを置き換える直前に
+    呼ばれ、continue_last_shard=True (中断された実行の再開) では最後のファイルにヘッダーを書かずに続けます。
+    pack_window > 0 では先の pack_window 件を見てファイルに詰め直し、rebuild=True では最初のファイルから
+    分割し直します (内容が同じファイルは置き換えず、余ったファイルは削除します)。
+    last_processed_time が None の場合は、受け取った中で最も新しい日時を last_entry_time_file に記録します。
     """
-    file_index = 1
-    
-    def get_indexed_filename(idx: int) -> str:
-        return f"{output_basename}-{idx:02d}{output_ext}"
-
-    # 既存のファイルがある場合、ファイルインデックスを調整し、追記モードを決定
-    is_append_mode = False
-    temp_file_index = 1
-    while os.path.exists(get_indexed_filename(temp_file_index)):
-        is_append_mode = True
-        temp_file_index += 1
-    if temp_file_index > 1:
-        file_index = temp_file_index - 1
-    
-    output_filename = get_indexed_filename(file_index)
-    current_file_size = 0
-
-    if is_append_mode and os.path.exists(output_filename):
-        current_file_size = os.path.getsize(output_filename)
-
-    header = "# Notebook Notes Archive
-
-"
-    header += f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-"
-
-    current_file_size += len(header.encode("utf-8"))
-    
-    texts_buffer = []
-    total_files_written = 0
+    # 既存のファイルがある場合、マニフェストの最後のファイルに追記する
+    # (マニフェストがなければ一度だけディスクから作り直す)
+    shards = load_manifest(output_basename) if not rebuild else []
+    if shards is None:
+        shards = rebuild_manifest(output_basename, output_ext)
 
-    for text in markdown_texts:
-        text_size = len(text.encode("utf-8"))
-
-        if current_file_size + text_size > file_size_limit and texts_buffer:
-            write_markdown_file(output_filename, header, texts_buffer, is_append_mode)
-            print(
-                t("appended_to_file", output_filename)
-                if is_append_mode
-                else t("written_to_file", output_filename)
-            )
-            total_files_written += 1
-
-            file_index += 1
-            output_filename = get_indexed_filename(file_index)
-            is_append_mode = False  # 新しいファイルなので追記モードではない
-            texts_buffer = []
-            current_file_size = len(header.encode("utf-8"))
-
-        texts_buffer.append(text)
-        current_file_size += text_size
-
-    if texts_buffer:
-        write_markdown_file(output_filename, header, texts_buffer, is_append_mode)
-        print(
-            t("appended_to_file", output_filename)
-            if is_append_mode
-            else t("written_to_file", output_filename)
+    is_append_mode = bool(shards)
+    if is_append_mode:
+        shard = shards[-1]
+        file_index = shard["index"]
+        current_file_size = shard["bytes"]
+    else:
+        file_index = 1
+        current_file_size = 0
+        shard = {"index": file_index, "file": "", "bytes": 0, "entries": 0, "first": None, "last": None}
+
+    def get_shard_filename(idx: int) -> str:
+        return get_indexed_filename(output_basename, output_ext, idx)
+
+    output_filename = get_shard_filename(file_index)
+    shard["file"] = os.path.basename(output_filename)
+
+    header = "# Notebook Notes Archive\n\n"
+    header += f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    header_bytes = header.encode("utf-8")  # ヘッダーのエンコードは1回だけ
+    rebuilding = _Rebuild(header_bytes) if rebuild else None
+
+    # 再開時は最後のファイルを書き込み済みのエントリを含むものとして扱い、上限を超えるなら次のファイルに進む
+    continuing = is_append_mode and continue_last_shard
+    shard_header = b"" if continuing else header_bytes
+    current_file_size += len(shard_header)
+
+    if pack_window > 0:
+        total_files_written, newest_item_time = _save_packed(
+            markdown_texts,
+            output_basename,
+            get_shard_filename,
+            file_size_limit,
+            pack_window,
+            header_bytes,
+            (shard, current_file_size, shard_header, continuing) if is_append_mode else None,
+            file_index + 1 if is_append_mode else file_index,
+            before_commit,
+            rebuilding,
         )
+        if rebuilding is not None:
+            _finish_rebuild(rebuilding, output_basename, output_ext, total_files_written)
+        if last_processed_time is None:
+            last_processed_time = newest_item_time
+        if last_processed_time is not None:
+            write_last_entry_time(last_processed_time, last_entry_time_file)
+        return total_files_written
+
+    out: Optional[BinaryIO] = None
+    buffered_entries = 0
+    committed_entries = 0
+    buffer_first: Optional[datetime] = None
+    total_files_written = 0
+    last_item_time: Optional[datetime] = None
+    newest_item_time: Optional[datetime] = None  # チェックポイント (新しい順のフィードでは最初のエントリ)
+    index_run = _IndexRun(0)  # 書き込み中のファイルのエントリのインデックス
+    crc32 = zlib.crc32
+    body_hash = hashlib.blake2b()  # rebuild: 書き込み中のファイルのヘッダー以降の内容のハッシュ
+
+    try:
+        for item in markdown_texts:
+            if isinstance(item, tuple):
+                item_time, text = item
+            else:
+                item_time, text = None, item
+            data = text.encode("utf-8")
+            text_size = len(data)
+
+            if current_file_size + text_size > file_size_limit and (buffered_entries or continuing):
+                if out is not None:
+                    committed_entries += buffered_entries
+                    _finish_shard(out, output_basename, output_filename, is_append_mode, shard,
+                                  current_file_size, buffered_entries, buffer_first, last_item_time,
+                                  committed_entries, [], before_commit, index_run, rebuilding, body_hash.digest())
+                    out = None
+                    body_hash = hashlib.blake2b()
+                    total_files_written += 1
+                continuing = False
+
+                file_index += 1
+                output_filename = get_shard_filename(file_index)
+                is_append_mode = False  # 新しいファイルなので追記モードではない
+                buffered_entries = 0
+                buffer_first = None
+                shard_header = header_bytes
+                current_file_size = len(header_bytes)
+                shard = {
+                    "index": file_index,
+                    "file": os.path.basename(output_filename),
+                    "bytes": 0,
+                    "entries": 0,
+                    "first": None,
+                    "last": None,
+                }
+
+            if out is None:
+                out = open_markdown_file(output_filename, shard_header, is_append_mode)
+                write = out.write
+                index_run = _IndexRun(current_file_size)
+                # _IndexRun.add をエントリごとに呼ばずに済むよう、追加先を束縛しておく
+                add_length, add_heading, add_hash = (
+                    index_run.lengths.append, index_run.headings.append, index_run.hashes.append
+                )
+            write(data)
+            add_length(text_size)
+            add_heading(data[:data.find(b"\n\n", data.find(b"\n\n") + 2)])  # _heading
+            add_hash(crc32(data))
+            if rebuilding is not None:
+                body_hash.update(data)
+            buffered_entries += 1
+            current_file_size += text_size
+            if item_time is not None:
+                if buffer_first is None:
+                    buffer_first = item_time
+                last_item_time = item_time
+                if newest_item_time is None or item_time > newest_item_time:
+                    newest_item_time = item_time
+    except BaseException:
+        # 書きかけの一時ファイルを捨てる (元のファイルとマニフェストは書き込み前のまま)
+        if out is not None:
+            out.close()
+            os.remove(out.name)
+        raise
+
+    if out is not None:
+        committed_entries += buffered_entries
+        _finish_shard(out, output_basename, output_filename, is_append_mode, shard,
+                      current_file_size, buffered_entries, buffer_first, last_item_time,
+                      committed_entries, [], before_commit, index_run, rebuilding, body_hash.digest())
         total_files_written += 1
+    if rebuilding is not None:
+        _finish_rebuild(rebuilding, output_basename, output_ext, total_files_written)
+
+    if last_processed_time is None:
+        last_processed_time = newest_item_time
+    if last_processed_time is not None:
+        write_last_entry_time(last_processed_time, last_entry_time_file)
 
-    if last_processed_time != datetime.min.replace(tzinfo=timezone.utc):
-        with open(LAST_ENTRY_TIME_FILE, "w", encoding="utf-8") as f:
-            f.write(last_processed_time.isoformat())
-            
     return total_files_written
@@ -0,0 +1,136 @@
+"""
+--watch で使う受信フォルダーの監視。
+
+Linux では inotify (ctypes で libc を直接呼び出す) で、書き込みを終えて閉じられたファイルと
+フォルダーへ移動されてきたファイルを待ちます。inotify を使えない環境では一定間隔でフォルダーを調べ、
+大きさと更新時刻が1間隔のあいだ変わらなかったファイルを書き込み完了とみなします。
+"""
+import os
+import select
+import struct
+import sys
+import time
+from typing import Callable, Optional, Union
+
+# inotify のイベント (sys/inotify.h)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len (この後に len バイトの名前が続く)
+
+# ダウンロード途中のファイルなど、完成していないことが名前から分かるもの
+_INCOMPLETE_SUFFIXES = (".part", ".partial", ".crdownload", ".download", ".tmp")
+
+
+def is_candidate(name: str, accept: Callable[[str], bool]) -> bool:
+    """Whether a file name in the inbox may be a finished export"""
+    lower = name.lower()
+    return not name.startswith(".") and not lower.endswith(_INCOMPLETE_SUFFIXES) and accept(lower)
+
+
+def file_signature(path: str) -> Optional[tuple[int, int]]:
+    """(size, mtime_ns) of a file, or None if it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def scan_inbox(directory: str, accept: Callable[[str], bool]) -> dict[str, tuple[int, int]]:
+    """Return {path: (size, mtime_ns)} of the candidate files directly inside directory"""
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and is_candidate(entry.name, accept):
+                stat = entry.stat()
+                found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+class PollingWatcher:
+    """Report files whose size and mtime stayed the same for one polling interval"""
+
+    method = "polling"
+
+    def __init__(self, directory: str, accept: Callable[[str], bool], interval: float):
+        self.directory = directory
+        self.accept = accept
+        self.interval = interval
+        self._previous = scan_inbox(directory, accept)
+        self._reported = dict(self._previous)  # 起動時にあったファイルは呼び出し側が処理する
+
+    def wait(self) -> list[str]:
+        time.sleep(self.interval)
+        current = scan_inbox(self.directory, self.accept)
+        completed = [
+            path for path, signature in current.items()
+            if self._previous.get(path) == signature and self._reported.get(path) != signature
+        ]
+        for path in completed:
+            self._reported[path] = current[path]
+        self._previous = current
+        return sorted(completed)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Report files closed after writing in, or moved into, the directory (Linux inotify through ctypes)"""
+
+    method = "inotify"
+
+    def __init__(self, directory: str, accept: Callable[[str], bool], interval: float):
+        import ctypes
+        import ctypes.util
+
+        self.directory = directory
+        self.accept = accept
+        self.interval = interval
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed", directory)
+
+    def wait(self) -> list[str]:
+        # interval ごとに制御を戻し、Ctrl+C などに応答できるようにする
+        readable, _, _ = select.select([self._fd], [], [], self.interval)
+        if not readable:
+            return []
+        data = os.read(self._fd, 1 << 16)
+        completed: list[str] = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            if mask & _IN_Q_OVERFLOW:
+                # イベントが溢れた場合はフォルダー全体を調べ直す (処理済みかどうかは呼び出し側が判定する)
+                return sorted(scan_inbox(self.directory, self.accept))
+            path = os.path.join(self.directory, name)
+            if name and is_candidate(name, self.accept) and path not in completed:
+                completed.append(path)
+        return completed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def open_watcher(
+    directory: str, accept: Callable[[str], bool], interval: float = 2.0
+) -> Union[InotifyWatcher, PollingWatcher]:
+    """Watch directory with inotify where available, otherwise by polling every interval seconds"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory, accept, interval)
+        except (OSError, AttributeError):
+            pass  # 上限に達している場合や libc に inotify がない場合
+    return PollingWatcher(directory, accept, interval)
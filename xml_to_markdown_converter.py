@@ -1,500 +1,571 @@
+import codecs
 import contextlib
 import html as html_module
+import io
 import json
-import locale
+import mmap
 import os
 import re
-import tkinter as tk
-from tkinter import filedialog
+import sys
+import time
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
-from typing import Any, Optional
-
-# TRANSLATIONSに含まれる言語名からISO 639-1コードへのマッピング辞書
-LANG_MAP = {
-    "Arabic": "ar",
-    "Bengali": "bn",
-    "German": "de",
-    "English": "en",
-    "Spanish": "es",
-    "Persian": "fa",
-    "French": "fr",
-    "Hindi": "hi",
-    "Indonesian": "id",
-    "Japanese": "ja",
-    "Javanese": "jv",
-    "Korean": "ko",
-    "Marathi": "mr",
-    "Malay": "ms",
-    "Punjabi": "pa",
-    "Portuguese": "pt",
-    "Russian": "ru",
-    "Swahili": "sw",
-    "Tamil": "ta",
-    "Telugu": "te",
-    "Thai": "th",
-    "Turkish": "tr",
-    "Ukrainian": "uk",
-    "Urdu": "ur",
-    "Vietnamese": "vi",
-    "Chinese_China": "zh_CN",
-    "Chinese_Taiwan": "zh_TW",
-}
-
-TRANSLATIONS = {
-    "ar": {
-        "error_lang_detection": "خطأ أثناء اكتشاف لغة النظام: {}",
-        "file_not_found": "خطأ: الملف غير موجود: {}",
-        "json_decode_error": "خطأ في فك ترميز JSON: {}",
-        "xml_parse_error": "خطأ في تحليل XML: {}",
-        "start_processing": "ðŸš€ بدء المعالجة: جاري تحميل {}...",
-        "extracted_entries": "تم استخراج {0} مدخلات، منها {1} هي سجل Gemini.",
-        "converting_markdown": "جاري التحويل إلى Markdown...",
-        "appended_to_file": "تمت إضافة سجلات الدردشة إلى الملف: {}",
-        "written_to_file": "تم كتابة سجلات الدردشة إلى الملف: {}",
-        "processing_complete": "âœ… اكتمل: تم حفظ السجل من {0} إلى {1} في إجمالي {2} ملفات.",
-        "error_occurred": "حدث خطأ: {}",
-    },
-    "bn": {
-        "error_lang_detection": "সিস্টেম ভাষা সনাক্তকরণে ত্রুটি: {}",
-        "file_not_found": "ত্রুটি: ফাইল পাওয়া যায়নি: {}",
-        "json_decode_error": "JSON ডিকোড ত্রুটি: {}",
-        "xml_parse_error": "XML পার্স ত্রুটি: {}",
-        "start_processing": "ðŸš€ প্রক্রিয়াকরণ শুরু হচ্ছে: {} লোড হচ্ছে...",     
-        "extracted_entries": "{0} এন্ট্রি বের করা হয়েছে, যার মধ্যে {1} টি Gemini ইতিহাস।",
-        "converting_markdown": "Markdown এ রূপান্তর করা হচ্ছে...",
-        "appended_to_file": "চ্যাট ইতিহাস ফাইলে যোগ করা হয়েছে: {}",
-        "written_to_file": "চ্যাট ইতিহাস ফাইলে লেখা হয়েছে: {}",
-        "processing_complete": "âœ… সম্পন্ন: {0} থেকে {1} পর্যন্ত ইতিহাস মোট {2} ফাইলে সংরক্ষণ করা হয়েছে।",
-        "error_occurred": "একটি ত্রুটি ঘটেছে: {}",
-    },
-    "de": {
-        "error_lang_detection": "Fehler bei der Erkennung der Systemsprache: {}",
-        "file_not_found": "Fehler: Datei nicht gefunden: {}",
-        "json_decode_error": "JSON-Decodierungsfehler: {}",
-        "xml_parse_error": "XML-Parse-Fehler: {}",
-        "start_processing": "ðŸš€ Verarbeitung gestartet: Lade {}...",
-        "extracted_entries": "{0} Einträge extrahiert, davon sind {1} Gemini-Verlauf.",
-        "converting_markdown": "Konvertiere zu Markdown...",
-        "appended_to_file": "Chatverläufe an Datei angehängt: {}",
-        "written_to_file": "Chatverläufe in Datei geschrieben: {}",
-        "processing_complete": "âœ… Abgeschlossen: Verlauf von {0} bis {1} in insgesamt {2} Dateien gespeichert.",
-        "error_occurred": "Ein Fehler ist aufgetreten: {}",
-    },
-    "en": {
-        "error_lang_detection": "Error while detecting system language: {}",
-        "file_not_found": "Error: File not found: {}",
-        "json_decode_error": "JSON decode error: {}",
-        "xml_parse_error": "XML parse error: {}",
-        "start_processing": "ðŸš€ Starting processing: Loading {}...",
-        "extracted_entries": "Extracted {0} entries, of which {1} are Gemini history.",
-        "converting_markdown": "Converting to Markdown...",
-        "appended_to_file": "Chat histories appended to file: {}",
-        "written_to_file": "Chat histories written to file: {}",
-        "processing_complete": "âœ… Completed: Saved history after {0} to {1} into a total of {2} files.",
-        "error_occurred": "An error occurred: {}",
-    },
-    "es": {
-        "error_lang_detection": "Error al detectar el idioma del sistema: {}",
-        "file_not_found": "Error: Archivo no encontrado: {}",
-        "json_decode_error": "Error al decodificar JSON: {}",
-        "xml_parse_error": "Error de análisis XML: {}",
-        "start_processing": "ðŸš€ Iniciando procesamiento: Cargando {}...",
-        "extracted_entries": "Se extrajeron {0} entradas, de las cuales {1} son historial de Gemini.",
-        "converting_markdown": "Convirtiendo a Markdown...",
-        "appended_to_file": "Historiales de chat agregados al archivo: {}",
-        "written_to_file": "Historiales de chat escritos en el archivo: {}",
-        "processing_complete": "âœ… Completado: Historial guardado desde {0} hasta {1} en un total de {2} archivos.",
-        "error_occurred": "Ocurrió un error: {}",
-    },
-    "fa": {
-        "error_lang_detection": "خطا در شناسایی زبان سیستم: {}",
-        "file_not_found": "خطا: فایل پیدا نشد: {}",
-        "json_decode_error": "خطای رمزگشایی JSON: {}",
-        "xml_parse_error": "خطای تجزیه XML: {}",
-        "start_processing": "ðŸš€ شروع پردازش: در حال بارگذاری {}...",
-        "extracted_entries": "{0} ورودی استخراج شد که {1} مورد از آنها تاریخچه Gemini است.",     
-        "converting_markdown": "در حال تبدیل به Markdown...",
-        "appended_to_file": "تاریخچه چت به فایل اضافه شد: {}",
-        "written_to_file": "تاریخچه چت در فایل نوشته شد: {}",
-        "processing_complete": "âœ… تکمیل شد: تاریخچه از {0} تا {1} در مجموع در {2} فایل ذخیره شد.",
-        "error_occurred": "یک خطا رخ داد: {}",
-    },
-    "fr": {
-        "error_lang_detection": "Erreur lors de la détection de la langue du système : {}",
-        "file_not_found": "Erreur : Fichier non trouvé : {}",
-        "json_decode_error": "Erreur de décodage JSON : {}",
-        "xml_parse_error": "Erreur d'analyse XML : {}",
-        "start_processing": "ðŸš€ Démarrage du traitement : Chargement de {}...",
-        "extracted_entries": "{0} entrées extraites, dont {1} sont l'historique Gemini.",
-        "converting_markdown": "Conversion en Markdown...",
-        "appended_to_file": "Historiques de chat ajoutés au fichier : {}",
-        "written_to_file": "Historiques de chat écrits dans le fichier : {}",
-        "processing_complete": "âœ… Terminé : Historique sauvegardé de {0} à {1} dans un total de {2} fichiers.",
-        "error_occurred": "Une erreur est survenue : {}",
-    },
-    "hi": {
-        "error_lang_detection": "त्रुटि: सिस्टम भाषा का पता लगाने में समस्या: {}",
-        "file_not_found": "त्रुटि: फ़ाइल नहीं मिली: {}",
-        "json_decode_error": "JSON डिकोड त्रुटि: {}",
-        "xml_parse_error": "XML पार्स त्रुटि: {}",
-        "start_processing": "ðŸš€ प्रसंस्करण शुरू हो रहा है: {} लोड हो रहा है...",
-        "extracted_entries": "Ditemukan {0} entri, di mana {1} adalah riwayat Gemini.",
-        "converting_markdown": "Mengonversi ke Markdown...",
-        "appended_to_file": "Riwayat obrolan ditambahkan ke file: {}",
-        "written_to_file": "Riwayat obrolan ditulis ke file: {}",
-        "processing_complete": "âœ… Selesai: Riwayat disimpan dari {0} hingga {1} dalam total {2} file.",
-        "error_occurred": "Terjadi kesalahan: {}",
-    },
-    "id": {
-        "error_lang_detection": "Error saat mendeteksi bahasa sistem: {}",
-        "file_not_found": "Error: File tidak ditemukan: {}",
-        "json_decode_error": "Error decode JSON: {}",
-        "xml_parse_error": "Error parse XML: {}",
-        "start_processing": "ðŸš€ Memulai pemrosesan: Memuat {}...",
-        "extracted_entries": "Estratti {0} voci, di cui {1} sono cronologia di Gemini.",
-        "converting_markdown": "Conversione in Markdown...",
-        "appended_to_file": "Cronologia chat aggiunta al file: {}",
-        "written_to_file": "Cronologia chat scritta nel file: {}",
-        "processing_complete": "âœ… Completato: Cronologia salvata da {0} a {1} in un totale di {2} file.",
-        "error_occurred": "Si è verificato un errore: {}",
-    },
-    "ja": {
-        "error_lang_detection": "システム言語の検出中にエラーが発生しました: {}",
-        "file_not_found": "エラー: ファイルが見つかりません: {}",
-        "json_decode_error": "JSONデコードエラー: {}",
-        "xml_parse_error": "XMLパースエラー: {}",
-        "start_processing": "ðŸš€ 処理開始: {} を読み込み中...",
-        "extracted_entries": "{0} 件抽出され、うち Gemini の履歴は {1} 件ありました。",
-        "converting_markdown": "Markdown に変換中...",
-        "appended_to_file": "チャット履歴をファイルに追記しました: {}",
-        "written_to_file": "チャット履歴をファイルに書き込みました: {}",
-        "processing_complete": "âœ… 完了しました: {0} より後の {1} までの履歴を延べ {2} ファイルに分割保存しました。", 
-        "error_occurred": "エラーが発生しました: {}",
-    },
-    "jv": {
-        "error_lang_detection": "Kesalahan saat mendeteksi bahasa sistem: {}",
-        "file_not_found": "Kesalahan: Berkas tidak ditemukan: {}",
-        "json_decode_error": "Kesalahan dekode JSON: {}",
-        "xml_parse_error": "Kesalahan parse XML: {}",
-        "start_processing": "ðŸš€ Memulai pemrosesan: Memuat {}...",
-        "extracted_entries": "Ditemukan {0} entri, di mana {1} adalah riwayat Gemini.",
-        "converting_markdown": "Mengonversi ke Markdown...",
-        "appended_to_file": "Riwayat obrolan ditambahkan ke berkas: {}",
-        "written_to_file": "Riwayat obrolan ditulis ke berkas: {}",
-        "processing_complete": "âœ… Selesai: Riwayat disimpan dari {0} hingga {1} dalam total {2} berkas.",
-        "error_occurred": "Terjadi kesalahan: {}",
-    },
-    "ko": {
-        "error_lang_detection": "시스템 언어 설정 감지 중 오류 발생: {}",
-        "file_not_found": "오류: 파일을 찾을 수 없습니다: {}",
-        "json_decode_error": "JSON 디코드 오류: {}",
-        "xml_parse_error": "XML 파스 오류: {}",
-        "start_processing": "ðŸš€ 처리 시작: {} 로드 중...",
-        "extracted_entries": "{0}개의 항목이 추출되었고, 그 중 {1}개는 Gemini 기록입니다.",
-        "converting_markdown": "Markdown으로 변환 중...",
-        "appended_to_file": "채팅 기록이 파일에 추가되었습니다: {}",
-        "written_to_file": "채팅 기록이 파일에 작성되었습니다: {}",
-        "processing_complete": "âœ… 완료: {0}부터 {1}까지의 기록이 총 {2}개의 파일에 저장되었습니다.",
-        "error_occurred": "오류가 발생했습니다: {}",
-    },
-    "mr": {
-        "error_lang_detection": "त्रुटी: सिस्टम भाषा ओळखण्यात समस्या: {}",       
-        "file_not_found": "त्रुटी: फाइल सापडली नाही: {}",
-        "json_decode_error": "JSON डिकोड त्रुटी: {}",
-        "xml_parse_error": "XML पार्स त्रुटी: {}",
-        "start_processing": "ðŸš€ प्रक्रिया सुरू होत आहे: {} लोड होत आहे...",
-        "extracted_entries": "{0} नोंदी काढल्या, ज्यापैकी {1} Gemini इतिहास आहे.",
-        "converting_markdown": "Markdown मध्ये रूपांतरित करत आहे...",
-        "appended_to_file": "चॅट इतिहास फाइलमध्ये जोडला गेला: {}",
-        "written_to_file": "चॅट इतिहास फाइलमध्ये लिहिला गेला: {}",
-        "processing_complete": "âœ… पूर्ण झाले: इतिहास {0} पासून {1} पर्यंत एकूण {2} फाइल्समध्ये जतन केला गेला.",
-        "error_occurred": "एक त्रुटी आली आहे: {}",
-    },
-    "ms": {
-        "error_lang_detection": "Ralat semasa mengesan bahasa sistem: {}",
-        "file_not_found": "Ralat: Fail tidak dijumpai: {}",
-        "json_decode_error": "Ralat nyahkod JSON: {}",
-        "xml_parse_error": "Ralat huraian XML: {}",
-        "start_processing": "ðŸš€ Memulakan pemprosesan: Memuat {}...",
-        "extracted_entries": "Diekstrak {0} entri, di mana {1} adalah sejarah Gemini.",
-        "converting_markdown": "Menukar kepada Markdown...",
-        "appended_to_file": "Sejarah sembang ditambah ke fail: {}",
-        "written_to_file": "Sejarah sembang ditulis ke fail: {}",
-        "processing_complete": "âœ… Selesai: Sejarah disimpan dari {0} hingga {1} dalam jumlah {2} fail.",
-        "error_occurred": "Ralat telah berlaku: {}",
-    },
-    "pa": {
-        "error_lang_detection": "ਸਿਸਟਮ ਭਾਸ਼ਾ ਦਾ ਪਤਾ ਲਗਾਉਣ ਸਮੇਂ ਤਰੁੱਟੀ: {}",
-        "file_not_found": "ਤਰੁੱਟੀ: ਫਾਈਲ ਨਹੀਂ ਮਿਲੀ: {}",
-        "json_decode_error": "JSON ਡੀਕੋਡ ਤਰੁੱਟੀ: {}",
-        "xml_parse_error": "XML ਪਾਰਸ ਤਰੁੱਟੀ: {}",
-        "start_processing": "ðŸš€ ਪ੍ਰਕਿਰਿਆ ਸ਼ੁਰੂ ਹੋ ਰਹੀ ਹੈ: {} ਲੋਡ ਹੋ ਰਿਹਾ ਹੈ...",
-        "extracted_entries": "{0} ਐਂਟਰੀਆਂ ਨਿਕਾਲੀਆਂ ਗਈਆਂ, ਜਿਨ੍ਹਾਂ ਵਿੱਚੋਂ {1} Gemini ਇਤਿਹਾਸ ਹੈ।",
-        "converting_markdown": "Markdown ਵਿੱਚ ਬਦਲ ਰਿਹਾ ਹੈ...",
-        "appended_to_file": "ਚੈਟ ਇਤਿਹਾਸ ਫਾਈਲ ਵਿੱਚ ਸ਼ਾਮਲ ਕੀਤਾ ਗਿਆ: {}",        
-        "written_to_file": "ਚੈਟ ਇਤਿਹਾਸ ਫਾਈਲ ਵਿੱਚ ਲਿਖਿਆ ਗਿਆ: {}",
-        "processing_complete": "âœ… ਮੁਕੰਮਲ: ਇਤਿਹਾਸ {0} ਤੋਂ {1} ਤੱਕ ਕੁੱਲ {2} ਫਾਈਲਾਂ ਵਿੱਚ ਸੁਰੱਖਿਅਤ ਕੀਤਾ ਗਿਆ।",
-        "error_occurred": "ਇੱਕ ਤਰੁੱਟੀ ਆਈ: {}",
-    },
-    "pt": {
-        "error_lang_detection": "Erro ao detectar o idioma do sistema: {}",
-        "file_not_found": "Erro: Arquivo não encontrado: {}",
-        "json_decode_error": "Erro de decodificação JSON: {}",
-        "xml_parse_error": "Erro de análise XML: {}",
-        "start_processing": "ðŸš€ Iniciando processamento: Carregando {}...",
-        "extracted_entries": "Extraídas {0} entradas, das quais {1} são histórico do Gemini.",
-        "converting_markdown": "Convertendo para Markdown...",
-        "appended_to_file": "Históricos de chat adicionados ao arquivo: {}",
-        "written_to_file": "Históricos de chat escritos no arquivo: {}",
-        "processing_complete": "âœ… Concluído: Histórico salvo de {0} a {1} em um total de {2} arquivos.",
-        "error_occurred": "Ocorreu um erro: {}",
-    },
-    "ru": {
-        "error_lang_detection": "Ошибка при определении языка системы: {}",
-        "file_not_found": "Ошибка: Файл не найден: {}",
-        "json_decode_error": "Ошибка декодирования JSON: {}",
-        "xml_parse_error": "Ошибка синтаксического анализа XML: {}",
-        "start_processing": "ðŸš€ Начало обработки: Загрузка {}...",
-        "extracted_entries": "Извлечено {0} записей, из которых {1} относятся к истории Gemini.",   
-        "converting_markdown": "Преобразование в Markdown...",
-        "appended_to_file": "История чата добавлена в файл: {}",
-        "written_to_file": "История чата записана в файл: {}",
-        "processing_complete": "âœ… Завершено: История сохранена с {0} по {1} в общей сложности в {2} файлах.",
-        "error_occurred": "Произошла ошибка: {}",
-    },
-    "sw": {
-        "error_lang_detection": "Hitilafu wakati wa kugundua lugha ya mfumo: {}",
-        "file_not_found": "Hitilafu: Faili haikupatikana: {}",
-        "json_decode_error": "Hitilafu ya kutafsiri JSON: {}",
-        "xml_parse_error": "Hitilafu ya kuchanganua XML: {}",
-        "start_processing": "ðŸš€ Kuanzia usindikaji: Inapakia {}...",
-        "extracted_entries": "Imechota rekodi {0}, ambapo {1} ni historia ya Gemini.",
-        "converting_markdown": "Inabadilisha kuwa Markdown...",
-        "appended_to_file": "Historia za mazungumzo zimeongezwa kwenye faili: {}",
-        "written_to_file": "Historia za mazungumzo zimeandikwa kwenye faili: {}",
-        "processing_complete": "âœ… Imekamilika: Historia imehifadhiwa kutoka {0} hadi {1} katika jumla ya faili {2}.",
-        "error_occurred": "Hitilafu imetokea: {}",
-    },
-    "ta": {
-        "error_lang_detection": "சிஸ்டம் மொழியை கண்டறிதலில் பிழை: {}",
-        "file_not_found": "பிழை: கோப்பு காணப்படவில்லை: {}",
-        "json_decode_error": "JSON குறியாக்கி பிழை: {}",
-        "xml_parse_error": "XML பாகுபடுத்தல் பிழை: {}",
-        "start_processing": "ðŸš€ செயலாக்கம் தொடங்குகிறது: {} ஏற்றப்படுகிறது...",
-        "extracted_entries": "à¸”à¸¶à¸‡à¸‚à¹‰à¸­à¸¡à¸¹à¸¥ {0} à¸£à¸²à¸¢à¸à¸²à¸£ à¸‹à¸¶à¹ˆà¸‡à¸¡à¸µà¸›à¸£à¸°à¸§à¸±à¸•à¸´à¸‚à¸­à¸‡ Gemini à¸ˆà¸³à¸™à¸§à¸™ {1} à¸£à¸²à¸¢à¸à¸²à¸£",
-        "converting_markdown": "à¸à¸³à¸¥à¸±à¸‡à¹à¸›à¸¥à¸‡à¹€à¸›à¹‡à¸™ Markdown...",
-        "appended_to_file": "à¸›à¸£à¸°à¸§à¸±à¸•à¸´à¸à¸²à¸£à¹à¸Šà¸—à¸–à¸¹à¸à¹€à¸žà¸´à¹ˆà¸¡à¸¥à¸‡à¹ƒà¸™à¹„à¸Ÿà¸¥à¹Œ: {}",
-        "written_to_file": "à¸›à¸£à¸°à¸§à¸±à¸•à¸´à¸à¸²à¸£à¹à¸Šà¸—à¸–à¸¹à¸à¹€à¸‚à¸µà¸¢à¸™à¸¥à¸‡à¹ƒà¸™à¹„à¸Ÿà¸¥à¹Œ: {}",
-        "processing_complete": "âœ… à¹€à¸ªà¸£à¹‡à¸ˆà¸ªà¸´à¹‰à¸™: à¸šà¸±à¸™à¸—à¸¶à¸à¸›à¸£à¸°à¸§à¸±à¸•à¸´à¸ˆà¸²à¸ {0} à¸–à¸¶à¸‡ {1} à¸¥à¸‡à¹ƒà¸™à¹„à¸Ÿà¸¥à¹Œà¸—à¸±à¹‰à¸‡à¸«à¸¡à¸” {2} à¹„à¸Ÿà¸¥à¹Œ",
-        "error_occurred": "à¹€à¸à¸´à¸”à¸‚à¹‰à¸­à¸œà¸´à¸”à¸žà¸¥à¸²à¸”: {}",
-    },
-    "te": {
-        "error_lang_detection": "సిస్టమ్ భాషను గుర్తించడంలో లోపం: {}",
-        "file_not_found": "లోపం: ఫైల్ కనుగొనబడలేదు: {}",
-        "json_decode_error": "JSON డీకోడ్ లోపం: {}",
-        "xml_parse_error": "XML పార్సింగ్ లోపం: {}",
-        "start_processing": "ðŸš€ ప్రాసెసింగ్ ప్రారంభం: {} లోడ్ అవుతోంది...",  
-        "extracted_entries": "{0} ఎంట్రీలు తీసుకోబడ్డాయి, వాటిలో {1} జెమిని చరిత్ర.",
-        "converting_markdown": "Markdown కు మారుస్తోంది...",
-        "appended_to_file": "చాట్ చరిత్ర ఫైల్‌కు జోడించబడింది: {}",
-        "written_to_file": "చాట్ చరిత్ర ఫైల్‌కు రాయబడింది: {}",
-        "processing_complete": "âœ… పూర్తయింది: చరిత్ర {0} నుండి {1} వరకు మొత్తం {2} ఫైళ్ళలో సేవ్ చేయబడింది.",
-        "error_occurred": "లోపం సంభవించింది: {}",
-    },
-    "th": {
-        "error_lang_detection": "เกิดข้อผิดพลาดขณะตรวจจับภาษาของระบบ: {}",  
-        "file_not_found": "ข้อผิดพลาด: ไม่พบไฟล์: {}",
-        "json_decode_error": "ข้อผิดพลาดในการถอดรหัส JSON: {}",
-        "xml_parse_error": "ข้อผิดพลาดในการแยกวิเคราะห์ XML: {}",
-        "start_processing": "ðŸš€ เริ่มการประมวลผล: กำลังโหลด {}...",
-        "extracted_entries": "ดึงข้อมูล {0} รายการ ซึ่งมีประวัติของ Gemini จำนวน {1} รายการ",
-        "converting_markdown": "กำลังแปลงเป็น Markdown...",
-        "appended_to_file": "ประวัติการแชทถูกเพิ่มลงในไฟล์: {}",
-        "written_to_file": "ประวัติการแชทถูกเขียนลงในไฟล์: {}",
-        "processing_complete": "âœ… เสร็จสิ้น: บันทึกประวัติจาก {0} ถึง {1} ลงในไฟล์ทั้งหมด {2} ไฟล์",
-        "error_occurred": "เกิดข้อผิดพลาด: {}",
-    },
-    "tr": {
-        "error_lang_detection": "Sistem dili algılanırken hata oluştu: {}",
-        "file_not_found": "Hata: Dosya bulunamadı: {}",
-        "json_decode_error": "JSON kod çözme hatası: {}",
-        "xml_parse_error": "XML ayrıştırma hatası: {}",
-        "start_processing": "ðŸš€ İşleme başlıyor: {} yükleniyor...",
-        "extracted_entries": "{0} giriş çıkarıldı, bunların {1} tanesi Gemini geçmişi.",
-        "converting_markdown": "Markdown'a dönüştürülüyor...",
-        "appended_to_file": "Sohbet geçmişi dosyaya eklendi: {}",
-        "written_to_file": "Sohbet geçmişi dosyaya yazıldı: {}",
-        "processing_complete": "âœ… Tamamlandı: {0} ile {1} arasındaki geçmiş toplam {2} dosyaya kaydedildi.",
-        "error_occurred": "Bir hata oluştu: {}",
-    },
-    "uk": {
-        "error_lang_detection": "Помилка під час визначення мови системи: {}",
-        "file_not_found": "Помилка: Файл не знайдено: {}",
-        "json_decode_error": "Помилка декодування JSON: {}",
-        "xml_parse_error": "Помилка синтаксичного аналізу XML: {}",
-        "start_processing": "ðŸš€ Початок обробки: Завантаження {}...",
-        "extracted_entries": "Вилучено {0} записів, з яких {1} стосуються історії Gemini.",
-        "converting_markdown": "Конвертація в Markdown...",
-        "appended_to_file": "Історія чату додана до файлу: {}",
-        "written_to_file": "Історія чату записана у файл: {}",
-        "processing_complete": "âœ… Завершено: Історія з {0} по {1} збережена усього в {2} файлах.",
-        "error_occurred": "Сталася помилка: {}",
-    },
-    "ur": {
-        "error_lang_detection": "سسٹم زبان کا پتہ لگانے میں خرابی: {}",
-        "file_not_found": "خرابی: فائل نہیں ملی: {}",
-        "json_decode_error": "JSON ڈی کوڈنگ کی خرابی: {}",
-        "xml_parse_error": "XML پارسنگ کی خرابی: {}",
-        "start_processing": "ðŸš€ پراسیسنگ شروع ہو رہی ہے: {} لوڈ ہو رہا ہے...",
-        "extracted_entries": "{0} اندراجات نکالے گئے، جن میں سے {1} Gemini کی تاریخ ہے",
-        "converting_markdown": "Markdown میں تبدیل کیا جا رہا ہے...",
-        "appended_to_file": "چیٹ کی تاریخ فائل میں شامل کر دی گئی ہے: {}",
-        "written_to_file": "چیٹ کی تاریخ فائل میں لکھ دی گئی ہے: {}",
-        "processing_complete": "âœ… مکمل ہو گیا: تاریخ {0} سے {1} تک کل {2} فائلوں میں محفوظ کر دی گئی ہے",
-        "error_occurred": "ایک خرابی پیش آئی: {}",
-    },
-    "vi": {
-        "error_lang_detection": "Lỗi khi phát hiện ngôn ngữ hệ thống: {}",
-        "file_not_found": "Lỗi: Không tìm thấy tệp: {}",
-        "json_decode_error": "Lỗi giải mã JSON: {}",
-        "xml_parse_error": "Lỗi phân tích XML: {}",
-        "start_processing": "ðŸš€ Bắt đầu xử lý: Đang tải {}...",
-        "extracted_entries": "Đã trích xuất {0} mục, trong đó có {1} là lịch sử Gemini.",
-        "converting_markdown": "Đang chuyển đổi sang Markdown...",
-        "appended_to_file": "Lịch sử trò chuyện đã được thêm vào tệp: {}",
-        "written_to_file": "Lịch sử trò chuyện đã được ghi vào tệp: {}",
-        "processing_complete": "âœ… Hoàn thành: Đã lưu lịch sử từ {0} đến {1} vào tổng cộng {2} tệp.",
-        "error_occurred": "Đã xảy ra lỗi: {}",
-    },
-    "zh_CN": {
-        "error_lang_detection": "检测系统语言时出错：{}",
-        "file_not_found": "错误：未找到文件：{}",
-        "json_decode_error": "JSON 解码错误：{}",
-        "xml_parse_error": "XML 解析错误：{}",
-        "start_processing": "ðŸš€ 开始处理：正在加载 {}...",
-        "extracted_entries": "提取了 {0} 条项目，其中 {1} 条是 Gemini 历史记录。",
-        "converting_markdown": "正在转换为 Markdown...",
-        "appended_to_file": "聊天历史已追加到文件：{}",
-        "written_to_file": "聊天历史已写入文件：{}",
-        "processing_complete": "âœ… 完成：已将 {0} 到 {1} 之间的历史记录保存到共计 {2} 个文件中。",
-        "error_occurred": "发生错误：{}",
-    },
-    "zh_TW": {
-        "error_lang_detection": "偵測系統語言時出錯：{}",
-        "file_not_found": "錯誤：未找到檔案：{}",
-        "json_decode_error": "JSON 解碼錯誤：{}",
-        "xml_parse_error": "XML 解析錯誤：{}",
-        "start_processing": "ðŸš€ 開始處理：正在載入 {}...",
-        "extracted_entries": "擷取了 {0} 條項目，其中 {1} 條是 Gemini 歷史記錄。",
-        "converting_markdown": "正在轉換為 Markdown...",
-        "appended_to_file": "聊天歷史已追加到檔案：{}",
-        "written_to_file": "聊天歷史已寫入檔案：{}",
-        "processing_complete": "âœ… 完成：已將 {0} 到 {1} 之間的歷史記錄儲存到共計 {2} 個檔案中。",
-        "error_occurred": "發生錯誤：{}",
-    },
-}
-
-
-def get_system_language() -> str:
-    """detect OS language setting"""
-    try:
-        lang_tuple = locale.getlocale()
-        if lang_tuple[0]:
-            lang_name = lang_tuple[0].split("_")[0]
-            lang_code = LANG_MAP.get(lang_name, lang_name[:2].lower())
-        else:
-            lang_code = None
-
-        if lang_code is None:
-            return "en"
-
-        if lang_code == "zh_CN" or lang_code == "zh-Hans" or lang_name == "Chinese_China":
-            return "zh_CN"
-        elif lang_code == "zh_TW" or lang_code == "zh-Hant" or lang_name == "Chinese_Taiwan":
-            return "zh_TW"
+from typing import Any, BinaryIO, Callable, ContextManager, Iterable, Iterator, Optional
 
-        lang_code = lang_code.split("_")[0].split("-")[0].lower()
-        if lang_code in TRANSLATIONS:
-            return lang_code
-        return "en"
+from conversion_cache import DEFAULT_CACHE_MAX_BYTES, open_cache
+from i18n import LANG_MAP, get_system_language, set_language, t
+from profiling import NULL_PROFILE, Profile
 
-    except Exception as e:
-        error_msg = TRANSLATIONS.get("en", {}).get("error_lang_detection", "Error: {}")
-        print(error_msg.format(e))
-        return "en"
-
-
-def t(key: str, *args: Any) -> str:
-    """Translation function"""
-    lang = get_system_language()
-
-    msg_map: dict[str, str] = TRANSLATIONS.get(lang, TRANSLATIONS["en"])
-    msg: str = msg_map.get(key, TRANSLATIONS["en"].get(key, key))
-
-    if args:
-        try:
-            return msg.format(*args)
-        except IndexError:
-            # Safety measure in case the number of placeholders and variables do not match
-            return msg
-    return msg
 
 def select_xml_file() -> Optional[str]:
     """
     ファイル選択ダイアログを表示し、ユーザーが選択したXMLファイルのパスを返します。
     キャンセルされた場合はNoneを返します。
+    tkinter はダイアログが必要になったときにだけ読み込みます (ライブラリ利用やヘッドレス環境では不要)。
     """
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()  # メインウィンドウを非表示にする
     file_path = filedialog.askopenfilename(
         title="処理するXMLファイルを選択してください",
-        filetypes=[("XML files", "*.xml"), ("すべてのファイル", "*.*")]
+        filetypes=[("XML files", "*.xml *.xml.gz *.xml.bz2 *.xml.xz *.zip"), ("すべてのファイル", "*.*")]
     )
     root.destroy()
     return file_path
 
-def load_xml(filepath: str) -> Any:
-    """Load an XML file and return the root element."""
-    if not os.path.exists(filepath):
-        print(t("file_not_found", filepath))
+# ストリーミング読み込み時に一度に読み込むバイト数
+READ_CHUNK_SIZE = 1 << 16
+# 文字コード判定のために先読みする最大バイト数
+ENCODING_SNIFF_SIZE = 1 << 16
+# この大きさ以上のファイルはメモリマップして読み込む (0 以下で無効)
+MMAP_THRESHOLD = 64 << 20
+# メモリマップで読み終えた範囲を、この大きさごとにプロセスから切り離す
+MMAP_RELEASE_SIZE = 8 << 20
+
+# expat がそれ自身でデコードできる文字コード (これ以外は Python 側でデコードして渡す)
+_EXPAT_NATIVE_ENCODINGS = {"utf-8", "utf-16", "utf-16-le", "utf-16-be", "iso8859-1", "ascii"}
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_XML_DECL_ENCODING_RE = re.compile(rb"""^<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z][A-Za-z0-9._-]*)["']""")
+
+
+def _normalize_encoding(name: str) -> Optional[str]:
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
         return None
 
-    with open(filepath, 'rb') as f:
-        raw_bytes = f.read()
 
-    decoded_content = None
-    try:
-        decoded_content = raw_bytes.decode('shift-jis')
-    except UnicodeDecodeError:
-        try:
-            decoded_content = raw_bytes.decode('utf-8')
-        except UnicodeDecodeError as e:
-            print(t("xml_parse_error", f"UnicodeDecodeError: {e}"))
-            return None
+def _declared_encoding(prefix: bytes) -> Optional[str]:
+    """Return the encoding named in the XML declaration, if any."""
+    match = _XML_DECL_ENCODING_RE.match(prefix)
+    return _normalize_encoding(match.group(1).decode("ascii")) if match else None
+
+
+def detect_encoding(prefix: bytes) -> str:
+    """
+    Decide the encoding of an export from its first bytes.
+    Order: BOM, then a sniff of the non-ASCII bytes in the prefix, then the XML declaration.
+    Without any evidence the document is treated as UTF-8.
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
 
-    if decoded_content:
+    declared = _declared_encoding(prefix)
+    if prefix.isascii():
+        return declared or "utf-8"
+
+    for candidate in ("utf-8", declared, "shift-jis"):
+        if candidate is None:
+            continue
         try:
-            root = ET.fromstring(decoded_content)
-            return root
-        except ET.ParseError as e:
-            print(t("xml_parse_error", f"XML parse error after decoding: {e}"))
-            return None
+            # 先読み範囲の末尾で文字が途切れていてもエラーにしない
+            codecs.getincrementaldecoder(candidate)().decode(prefix, final=False)
+        except UnicodeDecodeError:
+            continue
+        return _normalize_encoding(candidate) or candidate
+    return "utf-8"
+
+
+def _iter_parser_input(f: Any) -> Iterator[Any]:
+    """
+    Read a binary stream in chunks and yield data ready for parser.feed().
+    The bytes are passed through untouched when expat can decode them itself;
+    otherwise each chunk is decoded incrementally (no full-size decoded copy).
+    """
+    chunk = f.read(max(READ_CHUNK_SIZE, ENCODING_SNIFF_SIZE))
+    prefix = bytes(chunk[:ENCODING_SNIFF_SIZE])  # メモリマップでは memoryview が返る
+    encoding = detect_encoding(prefix)
+    declared = _declared_encoding(prefix)
+
+    if encoding in _EXPAT_NATIVE_ENCODINGS and declared in (None, encoding):
+        while chunk:
+            yield chunk
+            chunk = f.read(READ_CHUNK_SIZE)
+        return
+
+    # str を渡すと expat は宣言を無視して UTF-8 として解析する
+    decoder = codecs.getincrementaldecoder("utf-8-sig" if encoding == "utf-8" else encoding)()
+    while chunk:
+        yield decoder.decode(chunk)
+        chunk = f.read(READ_CHUNK_SIZE)
+    yield decoder.decode(b"", final=True)
+
+
+# 標準入力から読み込むことを表すパス
+STDIN_PATH = "-"
+
+
+def input_exists(filepath: str) -> bool:
+    return filepath == STDIN_PATH or os.path.exists(filepath)
+
+
+class MappedInput:
+    """
+    Read-only memory map of an export with a file-like read() that returns memoryview slices:
+    the parser is fed straight from the OS page cache, without copying each chunk into a bytes object.
+    Pages already read are dropped from the mapping as reading advances, so the resident size stays
+    bounded however large the file is (the data stays in the page cache, which the OS can reclaim).
+    """
+
+    def __init__(self, filepath: str):
+        with open(filepath, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._can_release = hasattr(mmap, "MADV_DONTNEED")
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._mapped.madvise(mmap.MADV_SEQUENTIAL)
+        self._view = memoryview(self._mapped)
+        self._position = 0
+        self._released = 0
+
+    def read(self, size: int) -> memoryview:
+        # 前回までに返した範囲はパーサー・デコーダーが読み終えている
+        if self._can_release and self._position - self._released >= MMAP_RELEASE_SIZE:
+            end = self._position - self._position % mmap.PAGESIZE
+            self._mapped.madvise(mmap.MADV_DONTNEED, self._released, end - self._released)
+            self._released = end
+        chunk = self._view[self._position:self._position + size]
+        self._position += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        self._view.release()
+        # 呼び出し側がまだスライスを持っている場合は、それが解放されたときにマップも解放される
+        with contextlib.suppress(BufferError):
+            self._mapped.close()
+
+    def __enter__(self) -> "MappedInput":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def open_input(filepath: str, mmap_threshold: int = MMAP_THRESHOLD) -> ContextManager[Any]:
+    """
+    Open an export for binary reading ("-" reads standard input).
+    Files of at least mmap_threshold bytes are memory-mapped (MappedInput); mmap_threshold <= 0 never maps.
+    """
+    if filepath == STDIN_PATH:
+        return contextlib.nullcontext(sys.stdin.buffer)
+    if 0 < mmap_threshold <= os.path.getsize(filepath):
+        return MappedInput(filepath)
+    return open(filepath, "rb")
+
+
+# 圧縮されたエクスポートの先頭バイト (拡張子ではなく中身で判定する)
+_CONTAINER_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"PK\x03\x04", "zip"),
+)
+CONTAINER_MAGIC_SIZE = 6
+# --batch でディレクトリを指定したときに対象にするファイル
+EXPORT_SUFFIXES = (".xml", ".xml.gz", ".xml.bz2", ".xml.xz", ".zip")
+
+
+def detect_container(prefix: bytes) -> Optional[str]:
+    """Return "gzip", "bz2", "xz" or "zip" if prefix starts with the magic bytes of one, otherwise None"""
+    for magic, container in _CONTAINER_MAGIC:
+        if prefix.startswith(magic):
+            return container
     return None
 
+
+def _open_decompressed(container: str, raw: BinaryIO) -> BinaryIO:
+    """Wrap a gzip/bz2/xz stream so that read() returns decompressed bytes (the modules are imported on use)"""
+    if container == "gzip":
+        import gzip
+
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if container == "bz2":
+        import bz2
+
+        return bz2.BZ2File(raw, mode="rb")
+    import lzma
+
+    return lzma.LZMAFile(raw, mode="rb")
+
+
+def _iter_zip_members(archive_file: Any) -> Iterator[BinaryIO]:
+    """Yield a decompressing stream for every *.xml member of a zip archive, in archive order"""
+    import zipfile
+
+    with zipfile.ZipFile(archive_file) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and info.filename.lower().endswith(".xml"):
+                with archive.open(info) as member:
+                    yield member
+
+
+def iter_input_streams(filepath: str, mmap_threshold: int = MMAP_THRESHOLD) -> Iterator[BinaryIO]:
+    """
+    Yield a binary stream for each XML document of an export, decompressing on the fly:
+    plain XML and gzip/bz2/xz give one document, a zip archive one per *.xml member.
+    Nothing is extracted to disk; the container is recognised by its first bytes.
+    """
+    if filepath == STDIN_PATH:
+        stdin = sys.stdin.buffer
+        container = detect_container(stdin.peek(CONTAINER_MAGIC_SIZE)[:CONTAINER_MAGIC_SIZE])
+        if container is None:
+            yield stdin
+        elif container == "zip":
+            # zip は末尾の目録から読むため、シークできない標準入力はメモリに読み込む
+            yield from _iter_zip_members(io.BytesIO(stdin.read()))
+        else:
+            with _open_decompressed(container, stdin) as f:
+                yield f
+        return
+
+    with open(filepath, "rb") as f:
+        container = detect_container(f.read(CONTAINER_MAGIC_SIZE))
+    if container is None:
+        with open_input(filepath, mmap_threshold) as f:
+            yield f
+    elif container == "zip":
+        yield from _iter_zip_members(filepath)
+    else:
+        with open(filepath, "rb") as raw, _open_decompressed(container, raw) as f:
+            yield f
+
+
+def load_xml(filepath: str, mmap_threshold: int = MMAP_THRESHOLD) -> Any:
+    """
+    Load an XML file and return the root element.
+    For a zip archive with several XML members, the <item>s of the later members are
+    appended to the channel of the first one.
+    """
+    if not input_exists(filepath):
+        print(t("file_not_found", filepath))
+        return None
+
+    root = None
+    try:
+        with contextlib.closing(iter_input_streams(filepath, mmap_threshold)) as streams:
+            for f in streams:
+                parser = ET.XMLParser()
+                for data in _iter_parser_input(f):
+                    parser.feed(data)
+                document = parser.close()
+                if root is None:
+                    root = document
+                    continue
+                channel, other_channel = root.find("channel"), document.find("channel")
+                if channel is not None and other_channel is not None:
+                    channel.extend(other_channel.findall("item"))
+        return root
+    except UnicodeDecodeError as e:
+        print(t("xml_parse_error", f"UnicodeDecodeError: {e}"))
+        return None
+    except ET.ParseError as e:
+        print(t("xml_parse_error", f"XML parse error after decoding: {e}"))
+        return None
+
+
+def _decompression_errors() -> tuple[type[Exception], ...]:
+    """Exceptions raised for a truncated or corrupt compressed export (the modules are imported only on error)"""
+    import lzma
+    import zipfile
+    import zlib
+
+    return (EOFError, OSError, zlib.error, lzma.LZMAError, zipfile.BadZipFile)
+
+
+def iter_items(
+    filepath: str, profile: Profile = NULL_PROFILE, mmap_threshold: int = MMAP_THRESHOLD
+) -> Iterator[ET.Element]:
+    """
+    Stream the <item> elements of rss/channel one at a time.
+    Each element is cleared and detached from the tree once the caller has consumed it,
+    so memory use does not grow with the size of the export.
+    Compressed exports are decompressed while parsing; the members of a zip archive are read one after another.
+    Reading and decoding the chunks is timed as the "read_decode" stage of profile.
+    Raises ValueError if the export cannot be decoded, decompressed or parsed to its end, so that a
+    truncated export is never mistaken for the end of the feed (the caller must not advance its checkpoint).
+    """
+    if not input_exists(filepath):
+        print(t("file_not_found", filepath))
+        return
+
+    try:
+        with contextlib.closing(iter_input_streams(filepath, mmap_threshold)) as streams:
+            for f in streams:
+                yield from _iter_document_items(f, profile)
+    except UnicodeDecodeError as e:
+        raise ValueError(t("xml_parse_error", f"UnicodeDecodeError: {e}")) from e
+    except ET.ParseError as e:
+        raise ValueError(t("xml_parse_error", f"XML parse error after decoding: {e}")) from e
+    except _decompression_errors() as e:
+        raise ValueError(t("xml_parse_error", f"{type(e).__name__}: {e}")) from e
+
+
+def _iter_document_items(f: Any, profile: Profile) -> Iterator[ET.Element]:
+    """iter_items for one XML document (errors are raised from feed(), close() or read_events())"""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack: list[ET.Element] = []
+    channel_found = False
+
+    chunks = iter(profile.timed(_iter_parser_input(f), "read_decode"))
+    while True:
+        data = next(chunks, None)
+        if data is None:
+            parser.close()
+        else:
+            parser.feed(data)
+
+        for event, elem in parser.read_events():
+            if event == "start":
+                if len(stack) == 1 and elem.tag == "channel":
+                    channel_found = True
+                stack.append(elem)
+                continue
+            stack.pop()
+            # rss/channel/item のみを対象にする (load_xml + findall("item") と同じ範囲)
+            if elem.tag == "item" and len(stack) == 2 and stack[1].tag == "channel":
+                yield elem
+                elem.clear()
+                stack[1].remove(elem)
+
+        if data is None:
+            break
+
+    if not channel_found:
+        print(t("error_occurred", "No <channel> element found in XML."))
+
+
 def decode_unicode_escapes(s: str) -> str:
     """Decode Unicode escape sequences"""
 
     def repl(match):
         return chr(int(match.group(1), 16))
 
-    return re.sub(r"\u([0-9a-fA-F]{4})", repl, s)
+    return re.sub(r"\\u([0-9a-fA-F]{4})", repl, s)
+
+
+_HEADING_CLOSE_TAGS = frozenset(f"</h{level}>" for level in "123456")
+_BR_TAG_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+
+
+class _BoldMatcher:
+    """
+    Replays the leftmost, non-overlapping matching of
+    re.sub(r"<(b|strong)[^>]*>(.*?)</\1>", ...) over a stream of tag events.
+    Matched open/close tags are turned into "**" by patching their output slots.
+    """
+
+    def __init__(self, out: list[str]):
+        self.out = out
+        self.pending: dict[str, int] = {}  # tag kind -> slot of the earliest open tag still unmatched
+        # A match of one kind found while an earlier open tag of the other kind ("blocker")
+        # is still pending only holds if the blocker is never closed on the same line.
+        self.tentative: list[tuple[int, int]] = []
+        self.tentative_kind = ""
+        self.blocker_kind = ""
+        self.contingent_open: Optional[int] = None
+
+    def open(self, kind: str, slot: int) -> None:
+        if self.tentative:
+            if kind == self.tentative_kind and self.contingent_open is None:
+                self.contingent_open = slot
+            return
+        self.pending.setdefault(kind, slot)
+
+    def close(self, kind: str, slot: int) -> None:
+        if self.tentative:
+            if kind == self.blocker_kind:
+                # The blocker's match starts earlier and covers every tentative match
+                self._commit(self.pending[kind], slot)
+                self._reset()
+            elif self.contingent_open is not None:
+                self.tentative.append((self.contingent_open, slot))
+                self.contingent_open = None
+            return
+
+        start = self.pending.get(kind)
+        if start is None:
+            return
+        other = "strong" if kind == "b" else "b"
+        other_start = self.pending.get(other)
+        if other_start is not None and other_start < start:
+            self.tentative = [(start, slot)]
+            self.tentative_kind = kind
+            self.blocker_kind = other
+            return
+        self._commit(start, slot)
+        self._reset()
+
+    def newline(self) -> None:
+        """(.*?) cannot cross a line break: settle everything seen so far."""
+        if not self.pending:
+            return
+        for start, end in self.tentative:
+            self._commit(start, end)
+        self._reset()
+
+    def _commit(self, start: int, end: int) -> None:
+        self.out[start] = "**"
+        self.out[end] = "**"
+
+    def _reset(self) -> None:
+        self.pending.clear()
+        self.tentative = []
+        self.contingent_open = None
 
 
 def html_to_markdown(html_str: str) -> str:
     """
     Simple HTML -> Markdown/Text conversion
-    Remove HTML tags and format into readable text
+    Remove HTML tags and format into readable text.
+
+    Single-pass tag-event state machine producing the same output as
+    html_to_markdown_regex (a stray "<" inside a tag is the only case where the two differ).
+    Every character is visited a constant number of times, so the run time stays
+    linear even for unclosed or deeply nested tags.
+    """
+    if not html_str:
+        return ""
+
+    text = decode_unicode_escapes(html_str)
+    text = html_module.unescape(text)
+
+    out: list[str] = []
+    bold = _BoldMatcher(out)
+    # 見出しは閉じタグが同じ行に現れるまで確定できないため、その間の太字イベントを保留する
+    heading_slot: Optional[int] = None
+    heading_tag_has_newline = False
+    deferred: list[tuple[str, str, int]] = []
+
+    def bold_event(event: str, kind: str = "", slot: int = 0) -> None:
+        if heading_slot is not None:
+            deferred.append((event, kind, slot))
+        elif event == "newline":
+            bold.newline()
+        else:
+            getattr(bold, event)(kind, slot)
+
+    def resolve_heading(matched: bool) -> None:
+        nonlocal heading_slot
+        if matched or heading_tag_has_newline:
+            bold.newline()
+        heading_slot = None
+        for event, kind, slot in deferred:
+            bold_event(event, kind, slot)
+        deferred.clear()
+        if matched:
+            bold.newline()
+
+    def emit_text(chunk: str) -> None:
+        out.append(chunk)
+        if "\n" in chunk:
+            if heading_slot is not None:
+                resolve_heading(False)
+            bold_event("newline")
+
+    pos = 0
+    length = len(text)
+    while pos < length:
+        lt = text.find("<", pos)
+        gt = text.find(">", lt + 1) if lt >= 0 else -1
+        if gt < 0:
+            # これ以降にタグは存在しない
+            emit_text(text[pos:])
+            break
+        if gt == lt + 1:
+            # "<>" はタグとして扱われない
+            emit_text(text[pos:gt + 1])
+            pos = gt + 1
+            continue
+        if lt > pos:
+            emit_text(text[pos:lt])
+        pos = gt + 1
+
+        tag = text[lt:pos]
+        lower_tag = tag.lower()
+        has_newline = "\n" in tag
+        if has_newline and heading_slot is not None:
+            resolve_heading(False)
+
+        # Headings (h1-h6) -> **Heading** + line break
+        if lower_tag[1] == "h" and lower_tag[2] in "123456":
+            out.append("")
+            if heading_slot is None:
+                heading_slot = len(out) - 1
+                heading_tag_has_newline = has_newline
+        elif lower_tag in _HEADING_CLOSE_TAGS:
+            out.append("")
+            if heading_slot is not None:
+                out[heading_slot] = "\n**"
+                out[-1] = "**\n"
+                resolve_heading(True)
+        # List items (li) -> - + line break
+        elif lower_tag.startswith("<li"):
+            out.append("\n- ")
+            bold_event("newline")
+        # Paragraphs (p), line breaks (div), line breaks (br) -> line breaks
+        elif lower_tag == "</p>":
+            out.append("\n\n")
+            bold_event("newline")
+        elif lower_tag == "</div>":
+            out.append("\n")
+            bold_event("newline")
+        elif lower_tag.startswith("<br") and _BR_TAG_RE.fullmatch(tag):
+            out.append("\n")
+            bold_event("newline")
+        # Bold (b, strong) -> **text**
+        elif lower_tag.startswith(("<b", "<strong")):
+            out.append("")
+            if has_newline:
+                bold_event("newline")
+            bold_event("open", "b" if lower_tag.startswith("<b") else "strong", len(out) - 1)
+        elif lower_tag in ("</b>", "</strong>"):
+            out.append("")
+            bold_event("close", lower_tag[2:-1], len(out) - 1)
+        # Remove all other HTML tags (keep the content)
+        else:
+            out.append("")
+            if has_newline:
+                bold_event("newline")
+
+    if heading_slot is not None:
+        resolve_heading(False)
+    bold.newline()
+
+    # Organize consecutive blank lines (reduce 3 or more line breaks to 2)
+    return re.sub(r"\n{3,}", "\n\n", "".join(out)).strip()
+
+
+def html_to_markdown_regex(html_str: str) -> str:
+    """
+    Simple HTML -> Markdown/Text conversion (legacy regex implementation)
+    Remove HTML tags and format into readable text.
+    Kept for comparison with html_to_markdown, which produces the same output in one pass.
     """
     if not html_str:
         return ""
@@ -504,22 +575,15 @@ def html_to_markdown(html_str: str) -> str:
 
     # Replace major tags (h1-h6, li, p, div, br, b, strong) with Markdown-like symbols and line breaks
     # Headings (h1-h6) -> **Heading** + line break
-    text = re.sub(r"<h[1-6][^>]*>(.*?)</h[1-6]>", r"
-**\1**
-", text, flags=re.IGNORECASE)
+    text = re.sub(r"<h[1-6][^>]*>(.*?)</h[1-6]>", r"\n**\1**\n", text, flags=re.IGNORECASE)
 
     # List items (li) -> - + line break
-    text = re.sub(r"<li[^>]*>", r"
-- ", text, flags=re.IGNORECASE)
+    text = re.sub(r"<li[^>]*>", r"\n- ", text, flags=re.IGNORECASE)
 
     # Paragraphs (p), line breaks (div), line breaks (br) -> line breaks
-    text = re.sub(r"</p>", r"
-
-", text, flags=re.IGNORECASE)
-    text = re.sub(r"</div>", r"
-", text, flags=re.IGNORECASE)
-    text = re.sub(r"<br\s*/?>", r"
-", text, flags=re.IGNORECASE)
+    text = re.sub(r"</p>", r"\n\n", text, flags=re.IGNORECASE)
+    text = re.sub(r"</div>", r"\n", text, flags=re.IGNORECASE)
+    text = re.sub(r"<br\s*/?>", r"\n", text, flags=re.IGNORECASE)
 
     # Bold (b, strong) -> **text**
     text = re.sub(r"<(b|strong)[^>]*>(.*?)</\1>", r"**\2**", text, flags=re.IGNORECASE)
@@ -528,56 +592,197 @@ def html_to_markdown(html_str: str) -> str:
     text = re.sub(r"<[^>]+>", "", text)
 
     # Organize consecutive blank lines (reduce 3 or more line breaks to 2)
-    text = re.sub(r"
-{3,}", "
-
-", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
 
     return text.strip()
 
 
-def extract_text_content(entry_element: ET.Element, last_entry_time_loaded: datetime) -> tuple[datetime, str]:
-    """Extract Markdown-formatted text content from an XML entry element"""
+# 変換結果が変わる修正をしたら上げる (変換キャッシュのキーに含まれる)
+HTML_CONVERTER_VERSION = 1
 
-    # Extracting publish date
+# --html-engine で選択できる HTML -> Markdown 変換器
+HTML_CONVERTERS: dict[str, Callable[[str], str]] = {
+    "tokenizer": html_to_markdown,
+    "regex": html_to_markdown_regex,
+}
+
+
+def extract_entry_fields(entry_element: ET.Element) -> tuple[str, str, str]:
+    """Return the (pubDate, title, content:encoded HTML) strings of an <item> element"""
     pub_date_element = entry_element.find("pubDate")
-    time_str = pub_date_element.text if pub_date_element is not None else ""
+    title_element = entry_element.find("title")
+    content_encoded_element = entry_element.find("{http://purl.org/rss/1.0/modules/content/}encoded")
+    return (
+        (pub_date_element.text if pub_date_element is not None else "") or "",
+        (title_element.text if title_element is not None else "") or "",
+        (content_encoded_element.text if content_encoded_element is not None else "") or "",
+    )
 
-    dt: datetime = datetime.min.replace(tzinfo=timezone.utc)  # Default value
+
+def extract_entry_identity(entry_element: ET.Element) -> str:
+    """Return the <guid> of an <item> element, or its <link> if it has none ("" if neither)"""
+    for tag in ("guid", "link"):
+        text = entry_element.findtext(tag)
+        if text and text.strip():
+            return text.strip()
+    return ""
+
+
+PUB_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S %z"
+
+# Note が出力する pubDate の形式 ("Wed, 11 Feb 2026 14:50:38 +0900")。曜日・月は strptime と同じく大文字・小文字を区別しない
+_PUB_DATE_RE = re.compile(
+    r"(?:mon|tue|wed|thu|fri|sat|sun), \d\d [a-z]{3} \d{4} \d\d:\d\d:\d\d [+-]\d\d[0-5]\d",
+    re.ASCII | re.IGNORECASE,
+)
+_MONTHS = {
+    "jan": "-01-", "feb": "-02-", "mar": "-03-", "apr": "-04-", "may": "-05-", "jun": "-06-",
+    "jul": "-07-", "aug": "-08-", "sep": "-09-", "oct": "-10-", "nov": "-11-", "dec": "-12-",
+}
+
+
+def parse_pub_date(time_str: str) -> Optional[datetime]:
+    """
+    Parse an RSS pubDate such as 'Wed, 11 Feb 2026 14:50:38 +0900'; None if malformed.
+    The fixed layout Note uses is rearranged by position into ISO 8601 for datetime.fromisoformat
+    (several times faster than strptime); anything else goes through strptime, so the results are
+    always the same as strptime's.
+    """
+    if len(time_str) == 31 and _PUB_DATE_RE.fullmatch(time_str):
+        month = _MONTHS.get(time_str[8:11].lower())
+        if month is not None:
+            try:
+                return datetime.fromisoformat(
+                    time_str[12:16] + month + time_str[5:7] + "T" + time_str[17:25]
+                    + time_str[26:29] + ":" + time_str[29:31]
+                )
+            except ValueError:
+                pass  # 範囲外の値などは strptime に任せる
     try:
-        # pubDate format is like 'Wed, 11 Feb 2026 14:50:38 +0900'
-        if time_str:
-            dt = datetime.strptime(time_str, "%a, %d %b %Y %H:%M:%S %z")
+        return datetime.strptime(time_str, PUB_DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def iter_unprocessed_entries(
+    entries: Iterable[tuple[str, str, str]],
+    last_entry_time_loaded: datetime,
+    verify_window: int = 32,
+) -> Iterator[tuple[str, str, str]]:
+    """
+    Drop extract_entry_fields() tuples that are not newer than last_entry_time_loaded,
+    and stop reading once a newest-first feed reaches already processed entries.
+
+    The scan only stops while every date seen so far has been in descending order and
+    the next verify_window entries are old as well; any out-of-order date falls back
+    to a full scan, so an unsorted feed is filtered entry by entry as before.
+    """
+    previous: Optional[datetime] = None
+    newest_first = True
+    old_entries_seen = 0
+    read_count = 0
+
+    for fields in entries:
+        read_count += 1
+        dt = parse_pub_date(fields[0]) if fields[0] else None
+        if dt is None:
+            # 日時のないエントリは並び順の判定に使わず、convert_entry に判断を任せる
+            yield fields
+            continue
+
+        if newest_first and previous is not None and dt > previous:
+            newest_first = False
+            print(t("incremental_unsorted"))
+        previous = dt
+
+        if dt > last_entry_time_loaded:
+            yield fields
+            continue
+
+        old_entries_seen += 1
+        if newest_first and old_entries_seen > verify_window:
+            print(t("incremental_stopped", read_count))
+            return
+
+
+def convert_entry(
+    time_str: str,
+    title: str,
+    html_content: str,
+    last_entry_time_loaded: datetime,
+    html_converter: Callable[[str], str] = html_to_markdown,
+) -> tuple[datetime, str]:
+    """Build the Markdown text of one entry from its plain-string fields"""
+
+    dt: datetime = datetime.min.replace(tzinfo=timezone.utc)  # Default value
+    pub_date = parse_pub_date(time_str) if time_str else dt
+    if pub_date is None:
+        formatted_date = time_str
+    else:
+        dt = pub_date
         if dt <= last_entry_time_loaded:
             return dt, ""  # Skip already processed entries
         formatted_date = dt.strftime("%Y/%m/%d %H:%M:%S")
-    except ValueError:
-        formatted_date = time_str if time_str else "Unknown Date"
 
-    md_output = f"## {formatted_date}
-
-"
+    md_output = f"## {formatted_date}\n\n"
 
     # 1. Title
-    title_element = entry_element.find("title")
-    title = title_element.text if title_element is not None else ""
     if title:
-        md_output += f"**Title**: {title}
-
-"
+        md_output += f"**Title**: {title}\n\n"
 
     # 2. Content (from content:encoded, handling CDATA and HTML)
-    content_encoded_element = entry_element.find("{http://purl.org/rss/1.0/modules/content/}encoded")
-    html_content = content_encoded_element.text if content_encoded_element is not None else ""
-
     if html_content:
-        converted_text = html_to_markdown(html_content)
+        converted_text = html_converter(html_content)
         if converted_text.strip():
-            md_output += f"{converted_text}
+            md_output += f"{converted_text}\n\n"
 
-"
+    md_output += "---\n\n"  # Separator
+    return dt, md_output
 
-    md_output += "---
 
-"  # Separator
-    return dt, md_output
+def extract_text_content(
+    entry_element: ET.Element,
+    last_entry_time_loaded: datetime,
+    html_converter: Callable[[str], str] = html_to_markdown,
+) -> tuple[datetime, str]:
+    """Extract Markdown-formatted text content from an XML entry element"""
+    return convert_entry(*extract_entry_fields(entry_element), last_entry_time_loaded, html_converter)
+
+
+def cache_namespace(html_engine: str) -> str:
+    """Conversion cache namespace of an engine (results of other engines/versions are not reused)"""
+    return f"{html_engine}:{HTML_CONVERTER_VERSION}"
+
+
+def convert_entries(
+    batch: list[tuple[str, str, str]],
+    last_entry_time_loaded: datetime,
+    html_engine: str = "tokenizer",
+    cache_path: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    timed: bool = False,
+) -> list[tuple[Any, ...]]:
+    """
+    Convert a batch of extract_entry_fields() tuples.
+    Takes only picklable arguments so it can run in a worker process.
+    With cache_path, html_to_markdown is skipped for content already in the conversion cache.
+    With timed, each result is (datetime, Markdown, seconds spent converting the entry) (for --profile).
+    """
+    html_converter = HTML_CONVERTERS[html_engine]
+    cache = None
+    if cache_path is not None:
+        cache = open_cache(cache_path, cache_max_bytes, cache_namespace(html_engine))
+        cache.prefetch([html_content for _, _, html_content in batch if html_content])
+        html_converter = cache.wrap(html_converter)
+
+    if timed:
+        results: list[tuple[Any, ...]] = []
+        for fields in batch:
+            started = time.perf_counter()
+            dt, text = convert_entry(*fields, last_entry_time_loaded, html_converter)
+            results.append((dt, text, time.perf_counter() - started))
+    else:
+        results = [convert_entry(*fields, last_entry_time_loaded, html_converter) for fields in batch]
+    if cache is not None:
+        cache.commit()
+    return results